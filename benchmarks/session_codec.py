@@ -0,0 +1,80 @@
+"""
+Compares sessions stored as hashes with sessions stored as a single encoded value.
+
+Reports the memory used per session (MEMORY USAGE over a sample) and the median latency of get_session.
+Requires a running Redis configured as for the storages; uses the given database, which gets flushed.
+
+    python benchmarks/session_codec.py --database 15 --sessions 1000000
+"""
+
+from piracyshield_data_storage.account.session.memory import AccountSessionMemory
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+# shaped like the data stored by the authentication service
+session_data = {
+    'account_id': 'f2b1a6b0c0b6a2b1',
+    'ip_address': '203.0.113.10',
+    'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'created_at': '2024-01-01 00:00:00',
+    'role': '2'
+}
+
+def populate(memory: AccountSessionMemory, count: int) -> list:
+    sessions = []
+
+    for position in range(count):
+        token = uuid.uuid4().hex + uuid.uuid4().hex
+
+        account_id = f'account-{position % 10000}'
+
+        memory.add_short_session(account_id, None, token, session_data, 3600)
+
+        sessions.append(memory._get_session_key(account_id, 'short', token))
+
+    return sessions
+
+def measure_memory(memory: AccountSessionMemory, sessions: list, samples: int) -> float:
+    return statistics.mean(memory.instance.memory_usage(session) for session in random.sample(sessions, samples))
+
+def measure_latency(memory: AccountSessionMemory, sessions: list, rounds: int) -> float:
+    timings = []
+
+    for session in random.choices(sessions, k = rounds):
+        start = time.perf_counter()
+
+        memory.get_session(session)
+
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--database', type = int, default = 15)
+
+    parser.add_argument('--sessions', type = int, default = 1000000)
+
+    parser.add_argument('--rounds', type = int, default = 10000)
+
+    parser.add_argument('--samples', type = int, default = 1000)
+
+    parser.add_argument('--codecs', nargs = '+', default = ['', 'json', 'msgpack'])
+
+    arguments = parser.parse_args()
+
+    for codec in arguments.codecs:
+        memory = AccountSessionMemory(database = arguments.database, codec = codec)
+
+        memory.instance.flushdb()
+
+        sessions = populate(memory, arguments.sessions)
+
+        print(f'{codec or "hash":>8}: {measure_memory(memory, sessions, arguments.samples):.0f} bytes per session, {measure_latency(memory, sessions, arguments.rounds) * 1e6:.1f} us median get_session')
+
+    memory.instance.flushdb()
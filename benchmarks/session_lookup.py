@@ -0,0 +1,60 @@
+"""
+Measures the refresh token lookup while the number of stored sessions grows.
+
+Requires a running Redis configured as for the storages; uses the given database, which gets flushed.
+
+    python benchmarks/session_lookup.py --database 15
+"""
+
+from piracyshield_data_storage.account.session.memory import AccountSessionMemory
+
+import argparse
+import statistics
+import time
+import uuid
+
+def populate(memory: AccountSessionMemory, count: int) -> list:
+    tokens = []
+
+    for position in range(count):
+        token = uuid.uuid4().hex
+
+        memory.add_long_session(f'account-{position % 1000}', token, { 'ip_address': '127.0.0.1' }, 3600)
+
+        tokens.append(token)
+
+    return tokens
+
+def measure(memory: AccountSessionMemory, tokens: list, rounds: int) -> float:
+    timings = []
+
+    for position in range(rounds):
+        start = time.perf_counter()
+
+        memory.find_long_session(tokens[position % len(tokens)])
+
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--database', type = int, default = 15)
+
+    parser.add_argument('--rounds', type = int, default = 1000)
+
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [1000, 10000, 100000])
+
+    arguments = parser.parse_args()
+
+    memory = AccountSessionMemory(database = arguments.database)
+
+    for size in arguments.sizes:
+        memory.instance.flushdb()
+
+        tokens = populate(memory, size)
+
+        print(f'{size:>10} sessions: {measure(memory, tokens, arguments.rounds) * 1e6:.1f} us median lookup')
+
+    memory.instance.flushdb()
@@ -0,0 +1,321 @@
+from piracyshield_data_storage.database.redis.asyncio.document import DatabaseRedisAsyncDocument
+from piracyshield_data_storage.database.redis.document import DatabaseRedisGetException
+from piracyshield_data_storage.account.session.memory import AccountSessionMemory, AccountSessionMemorySetException, AccountSessionMemoryGetException
+from piracyshield_data_storage.account.session.codec import AccountSessionCodec
+
+from redis.exceptions import RedisError, ResponseError
+
+import time
+
+class AccountSessionAsyncMemory(DatabaseRedisAsyncDocument):
+
+    """
+    Asyncio counterpart of AccountSessionMemory.
+    """
+
+    session_prefix = AccountSessionMemory.session_prefix
+
+    session_index_prefix = AccountSessionMemory.session_index_prefix
+
+    session_token_prefix = AccountSessionMemory.session_token_prefix
+
+    scripts = AccountSessionMemory.scripts
+
+    def __init__(self, database: int, codec: str = None):
+        """
+        :param database: database index of the sessions.
+        :param codec: store each session as a single `json` or `msgpack` value instead of a hash, defaults to the `session_codec` setting.
+        """
+
+        super().__init__()
+
+        self.establish(database)
+
+        self.codec = AccountSessionCodec.get(self.database_config.get('session_codec') if codec is None else codec)
+
+        # encoded sessions are read as bytes
+        if self.codec is not None:
+            self.establish_raw(database)
+
+    async def add_long_session(self, account_id: str, refresh_token: str, data: dict, duration: int) -> bool | Exception:
+        """
+        Store an access token generated from a refresh token.
+
+        :param refresh_token: a valid refresh token.
+        :param access_token: a valid access token.
+        :param duration: refresh token expire time.
+        :return: true if the item has been stored.
+        """
+
+        session = self._get_session_key(account_id, 'long', refresh_token)
+
+        try:
+            return await self._add_session(account_id, session, data, duration, self._get_token_key(refresh_token))
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+    async def add_short_session(self, account_id: str, refresh_token: str, access_token: str, data: dict, duration: int) -> bool | Exception:
+        """
+        Store an access token generated from a refresh token.
+
+        :param refresh_token: a valid refresh token.
+        :param access_token: a valid access token.
+        :param duration: refresh token expire time.
+        :return: true if the item has been stored.
+        """
+
+        session = self._get_session_key(account_id, 'short', access_token)
+
+        try:
+            return await self._add_session(account_id, session, data, duration)
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+    async def get_all_by_account(self, account_id: str) -> list | Exception:
+        """
+        Retrieves all the active long and short sessions.
+
+        :param account_id: a valid account identifier.
+        :return: the requested data.
+        """
+
+        try:
+            pipeline = self.instance.pipeline()
+
+            # drop the sessions expired in the meantime
+            pipeline.zremrangebyscore(self._get_index_key(account_id), '-inf', time.time())
+
+            pipeline.zrange(self._get_index_key(account_id), 0, -1)
+
+            return (await pipeline.execute())[1]
+
+        except RedisError:
+            raise AccountSessionMemoryGetException()
+
+    async def get_all_short_by_account(self, account_id: str) -> list | Exception:
+        """
+        Retrieves all the active short sessions.
+
+        :param account_id: a valid account identifier.
+        :return: the requested data.
+        """
+
+        # the token part is left empty, so no digest
+        prefix = self._get_legacy_session_key(account_id, 'short', '')
+
+        return [session for session in await self.get_all_by_account(account_id) if session.startswith(prefix)]
+
+    async def get_session(self, session: str) -> list | Exception:
+        """
+        Retrieves a single session.
+
+        :param token: a valid refresh or access identifier.
+        :return: the requested data.
+        """
+
+        try:
+            if self.codec is None:
+                return await self.hgetall(
+                    key = session
+                )
+
+            return await self._get_encoded_session(session)
+
+        except (DatabaseRedisGetException, RedisError):
+            raise AccountSessionMemoryGetException()
+
+    async def find_long_session(self, refresh_token: str) -> str | None | Exception:
+        """
+        Retrieves a single session.
+
+        :param token: a valid refresh or access identifier.
+        :return: the session key or None if not found.
+        """
+
+        try:
+            # the first key holding a session wins, legacy keys come last
+            for session in await self.instance.mget(self._get_token_keys(refresh_token)):
+                if session:
+                    return session
+
+            return None
+
+        except RedisError:
+            raise AccountSessionMemoryGetException()
+
+    async def remove_long_session(self, account_id: str, refresh_token: str) -> bool | Exception:
+        """
+        Removes a long session.
+
+        :param account_id: a valid account identifier.
+        :param refresh_token: a valid active refresh token.
+        :return: true if the item has been removed.
+        """
+
+        sessions = self._get_session_keys(account_id, 'long', refresh_token)
+
+        try:
+            pipeline = self.instance.pipeline()
+
+            pipeline.delete(*sessions)
+
+            pipeline.delete(*self._get_token_keys(refresh_token))
+
+            pipeline.zrem(self._get_index_key(account_id), *sessions)
+
+            return (await pipeline.execute())[0] > 0
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+    async def remove_short_session(self, account_id: str, access_token: str) -> bool | Exception:
+        """
+        Removes a short session.
+
+        :param account_id: a valid account identifier.
+        :param access_token: a valid active access token.
+        :return: true if the item has been removed.
+        """
+
+        sessions = self._get_session_keys(account_id, 'short', access_token)
+
+        try:
+            pipeline = self.instance.pipeline()
+
+            pipeline.delete(*sessions)
+
+            pipeline.zrem(self._get_index_key(account_id), *sessions)
+
+            return (await pipeline.execute())[0] > 0
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+    async def revoke_all_by_account(self, account_id: str, blacklist: any = None) -> dict | Exception:
+        """
+        Removes every session of an account in one server-side operation.
+
+        :param account_id: a valid account identifier.
+        :param blacklist: optional SecurityBlacklistAsyncMemory, the revoked tokens are blacklisted for their remaining time.
+        :return: dictionary with the number of revoked long and short sessions and of blacklisted tokens.
+        """
+
+        try:
+            revoked = await self.run_script(
+                'revoke_all',
+                keys = [self._get_index_key(account_id)],
+                args = [self.session_token_prefix]
+            )
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+        # genre, token or its digest with compact keys, remaining milliseconds
+        sessions = [(*session.rsplit(':', 2)[1:], duration) for session, duration in zip(revoked[0::2], revoked[1::2])]
+
+        blacklisted = 0
+
+        if blacklist is not None and sessions:
+            blacklisted = await blacklist.add_tokens({ token: duration for genre, token, duration in sessions })
+
+        return {
+            'long': sum(1 for genre, token, duration in sessions if genre == 'long'),
+            'short': sum(1 for genre, token, duration in sessions if genre == 'short'),
+            'blacklisted': blacklisted
+        }
+
+    async def migrate_sessions(self, count: int = 1000) -> int | Exception:
+        """
+        Indexes the sessions stored before the session index existed and, with compact keys,
+        renames the sessions still keyed by their full token.
+        Uses SCAN, so it can run on a live database; running it again is harmless.
+
+        :param count: keys examined per SCAN iteration.
+        :return: the number of indexed sessions.
+        """
+
+        indexed = 0
+
+        try:
+            async for session in self.instance.scan_iter(match = f'{self.session_prefix}:*:*:*', count = count):
+                _, account_id, genre, token = session.split(':', 3)
+
+                duration = await self.instance.ttl(session)
+
+                # already expired or without expiry
+                if duration <= 0:
+                    continue
+
+                if self.compact_keys and not self._is_digest(token):
+                    legacy_session, session = session, self._get_compact_session_key(account_id, genre, token)
+
+                    pipeline = self.instance.pipeline()
+
+                    pipeline.rename(legacy_session, session)
+
+                    pipeline.zrem(self._get_index_key(account_id), legacy_session)
+
+                    if genre == 'long':
+                        pipeline.delete(self._get_legacy_token_key(token))
+
+                    # the session may expire between SCAN and RENAME, skip it then
+                    if any(isinstance(result, Exception) for result in await pipeline.execute(raise_on_error = False)):
+                        continue
+
+                # a compact session only knows the digest of its token
+                token_key = None
+
+                if genre == 'long':
+                    token_key = self._get_token_key_by_digest(token) if self._is_digest(token) else self._get_token_key(token)
+
+                await self._add_session(account_id, session, None, duration, token_key)
+
+                indexed += 1
+
+            return indexed
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+    async def _add_session(self, account_id: str, session: str, data: dict | None, duration: int, token_key: str = None) -> bool:
+        return await self.run_script(
+            'add_session',
+            keys = [session, self._get_index_key(account_id)] + ([token_key] if token_key else []),
+            args = [duration, time.time(), *self._get_session_args(data)]
+        ) == 1
+
+    async def _get_encoded_session(self, session: str) -> dict:
+        try:
+            value = await self.raw_instance.get(session)
+
+        except ResponseError as e:
+            # still a hash, stored before the codec was enabled
+            if str(e).startswith('WRONGTYPE'):
+                return await self.hgetall(key = session)
+
+            raise
+
+        return self.codec.decode(value) if value is not None else {}
+
+    # the key helpers are shared
+    _get_session_args = AccountSessionMemory._get_session_args
+
+    _get_session_key = AccountSessionMemory._get_session_key
+
+    _get_session_keys = AccountSessionMemory._get_session_keys
+
+    _get_compact_session_key = AccountSessionMemory._get_compact_session_key
+
+    _get_legacy_session_key = AccountSessionMemory._get_legacy_session_key
+
+    _get_index_key = AccountSessionMemory._get_index_key
+
+    _get_token_key = AccountSessionMemory._get_token_key
+
+    _get_token_keys = AccountSessionMemory._get_token_keys
+
+    _get_token_key_by_digest = AccountSessionMemory._get_token_key_by_digest
+
+    _get_legacy_token_key = AccountSessionMemory._get_legacy_token_key
@@ -0,0 +1,79 @@
+from abc import ABC, abstractmethod
+
+import json
+
+try:
+    import msgpack
+
+except ImportError:
+    msgpack = None
+
+class AccountSessionCodec(ABC):
+
+    """
+    Packs the data of a session in a single value instead of a hash.
+    """
+
+    name = None
+
+    @staticmethod
+    def get(name: str | None) -> 'AccountSessionCodec | None':
+        """
+        Returns the codec for the given name.
+
+        :param name: `json`, `msgpack` or None to keep sessions as hashes.
+        :return: the codec or None.
+        """
+
+        if not name:
+            return None
+
+        for codec in (AccountSessionJsonCodec, AccountSessionMsgpackCodec):
+            if codec.name == name:
+                return codec()
+
+        raise AccountSessionCodecNotAvailableException()
+
+    @abstractmethod
+    def encode(self, data: dict) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, value: bytes) -> dict:
+        pass
+
+    def _normalize(self, data: dict) -> dict:
+        # sessions read back exactly as they would from a hash of strings
+        return { str(field): value if isinstance(value, str) else str(value) for field, value in data.items() }
+
+class AccountSessionJsonCodec(AccountSessionCodec):
+
+    name = 'json'
+
+    def encode(self, data: dict) -> bytes:
+        return json.dumps(self._normalize(data), separators = (',', ':')).encode()
+
+    def decode(self, value: bytes) -> dict:
+        return json.loads(value)
+
+class AccountSessionMsgpackCodec(AccountSessionCodec):
+
+    name = 'msgpack'
+
+    def __init__(self):
+        if msgpack is None:
+            raise AccountSessionCodecNotAvailableException()
+
+    def encode(self, data: dict) -> bytes:
+        return msgpack.packb(self._normalize(data))
+
+    def decode(self, value: bytes) -> dict:
+        return msgpack.unpackb(value)
+
+class AccountSessionCodecNotAvailableException(Exception):
+
+    """
+    Unknown codec or missing dependency.
+    """
+
+    pass
@@ -1,14 +1,96 @@
-from piracyshield_data_storage.database.redis.document import DatabaseRedisDocument, DatabaseRedisSetException, DatabaseRedisGetException
+from piracyshield_data_storage.database.redis.document import DatabaseRedisDocument, DatabaseRedisGetException
+from piracyshield_data_storage.account.session.codec import AccountSessionCodec
+
+from redis.exceptions import RedisError, ResponseError
+
+import time
 
 class AccountSessionMemory(DatabaseRedisDocument):
 
     session_prefix = 'session'
 
-    def __init__(self, database: int):
+    # sorted set of the session keys of an account, scored by their expiry time
+    session_index_prefix = 'session_index'
+
+    # refresh token to long session key
+    session_token_prefix = 'session_token'
+
+    scripts = {
+        **DatabaseRedisDocument.scripts,
+
+        # KEYS[1]: session, KEYS[2]: session index, KEYS[3]: optional refresh token mapping
+        # ARGV[1]: duration, ARGV[2]: current time, ARGV[3]: storage of the data (hash, value or keep)
+        # ARGV[4..]: fields and values of the session, or its encoded value
+        'add_session': """
+            local duration = tonumber(ARGV[1])
+            local now = tonumber(ARGV[2])
+
+            if ARGV[3] == 'hash' then
+                redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+            elseif ARGV[3] == 'value' then
+                redis.call('SET', KEYS[1], ARGV[4])
+            end
+
+            redis.call('EXPIRE', KEYS[1], duration)
+
+            if KEYS[3] then
+                redis.call('SET', KEYS[3], KEYS[1], 'EX', duration)
+            end
+
+            redis.call('ZADD', KEYS[2], now + duration, KEYS[1])
+            redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+
+            -- the index lives as long as its longest session
+            if redis.call('TTL', KEYS[2]) < duration then
+                redis.call('EXPIRE', KEYS[2], duration)
+            end
+
+            return 1
+        """,
+
+        # KEYS[1]: session index, ARGV[1]: refresh token prefix
+        # returns the revoked session keys each followed by its remaining time in milliseconds
+        'revoke_all': """
+            local revoked = {}
+
+            for _, session in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+                local duration = redis.call('PTTL', session)
+                local genre, token = string.match(session, ':([^:]+):([^:]+)$')
+
+                if duration > 0 then
+                    table.insert(revoked, session)
+                    table.insert(revoked, duration)
+                end
+
+                redis.call('DEL', session)
+
+                if genre == 'long' then
+                    redis.call('DEL', ARGV[1] .. ':' .. token)
+                end
+            end
+
+            redis.call('DEL', KEYS[1])
+
+            return revoked
+        """
+    }
+
+    def __init__(self, database: int, codec: str = None):
+        """
+        :param database: database index of the sessions.
+        :param codec: store each session as a single `json` or `msgpack` value instead of a hash, defaults to the `session_codec` setting.
+        """
+
         super().__init__()
 
         self.establish(database)
 
+        self.codec = AccountSessionCodec.get(self.database_config.get('session_codec') if codec is None else codec)
+
+        # encoded sessions are read as bytes
+        if self.codec is not None:
+            self.establish_raw(database)
+
     def add_long_session(self, account_id: str, refresh_token: str, data: dict, duration: int) -> bool | Exception:
         """
         Store an access token generated from a refresh token.
@@ -19,14 +101,12 @@ class AccountSessionMemory(DatabaseRedisDocument):
         :return: true if the item has been stored.
         """
 
+        session = self._get_session_key(account_id, 'long', refresh_token)
+
         try:
-            return self.hset_with_expiry(
-                key = f'{self.session_prefix}:{account_id}:long:{refresh_token}',
-                mapping = data,
-                expiry = duration
-            )
+            return self._add_session(account_id, session, data, duration, self._get_token_key(refresh_token))
 
-        except DatabaseRedisSetException:
+        except RedisError:
             raise AccountSessionMemorySetException()
 
     def add_short_session(self, account_id: str, refresh_token: str, access_token: str, data: dict, duration: int) -> bool | Exception:
@@ -39,14 +119,12 @@ class AccountSessionMemory(DatabaseRedisDocument):
         :return: true if the item has been stored.
         """
 
+        session = self._get_session_key(account_id, 'short', access_token)
+
         try:
-            return self.hset_with_expiry(
-                key = f'{self.session_prefix}:{account_id}:short:{access_token}',
-                mapping = data,
-                expiry = duration
-            )
+            return self._add_session(account_id, session, data, duration)
 
-        except DatabaseRedisSetException:
+        except RedisError:
             raise AccountSessionMemorySetException()
 
     def get_all_by_account(self, account_id: str) -> list | Exception:
@@ -58,11 +136,16 @@ class AccountSessionMemory(DatabaseRedisDocument):
         """
 
         try:
-            return self.keys(
-                key = f'{self.session_prefix}:{account_id}:*:*'
-            )
+            pipeline = self.instance.pipeline()
+
+            # drop the sessions expired in the meantime
+            pipeline.zremrangebyscore(self._get_index_key(account_id), '-inf', time.time())
 
-        except DatabaseRedisGetException:
+            pipeline.zrange(self._get_index_key(account_id), 0, -1)
+
+            return pipeline.execute()[1]
+
+        except RedisError:
             raise AccountSessionMemoryGetException()
 
     def get_all_short_by_account(self, account_id: str) -> list | Exception:
@@ -73,13 +156,10 @@ class AccountSessionMemory(DatabaseRedisDocument):
         :return: the requested data.
         """
 
-        try:
-            return self.keys(
-                key = f'{self.session_prefix}:{account_id}:short:*'
-            )
+        # the token part is left empty, so no digest
+        prefix = self._get_legacy_session_key(account_id, 'short', '')
 
-        except DatabaseRedisGetException:
-            raise AccountSessionMemoryGetException()
+        return [session for session in self.get_all_by_account(account_id) if session.startswith(prefix)]
 
     def get_session(self, session: str) -> list | Exception:
         """
@@ -90,32 +170,33 @@ class AccountSessionMemory(DatabaseRedisDocument):
         """
 
         try:
-            return self.hgetall(
-                key = session
-            )
+            if self.codec is None:
+                return self.hgetall(
+                    key = session
+                )
+
+            return self._get_encoded_session(session)
 
-        except DatabaseRedisGetException:
+        except (DatabaseRedisGetException, RedisError):
             raise AccountSessionMemoryGetException()
 
-    def find_long_session(self, refresh_token: str) -> list | Exception:
+    def find_long_session(self, refresh_token: str) -> str | None | Exception:
         """
         Retrieves a single session.
 
         :param token: a valid refresh or access identifier.
-        :return: the requested data.
+        :return: the session key or None if not found.
         """
 
         try:
-            response = self.keys(
-                key = f'{self.session_prefix}:*:long:{refresh_token}'
-            )
-
-            if isinstance(response, list) and len(response):
-                return response.__getitem__(0)
+            # the first key holding a session wins, legacy keys come last
+            for session in self.instance.mget(self._get_token_keys(refresh_token)):
+                if session:
+                    return session
 
-            return response
+            return None
 
-        except DatabaseRedisGetException:
+        except RedisError:
             raise AccountSessionMemoryGetException()
 
     def remove_long_session(self, account_id: str, refresh_token: str) -> bool | Exception:
@@ -127,12 +208,20 @@ class AccountSessionMemory(DatabaseRedisDocument):
         :return: true if the item has been removed.
         """
 
+        sessions = self._get_session_keys(account_id, 'long', refresh_token)
+
         try:
-            return self.delete(
-                key = f'{self.session_prefix}:{account_id}:long:{refresh_token}'
-            )
+            pipeline = self.instance.pipeline()
+
+            pipeline.delete(*sessions)
+
+            pipeline.delete(*self._get_token_keys(refresh_token))
 
-        except DatabaseRedisSetException:
+            pipeline.zrem(self._get_index_key(account_id), *sessions)
+
+            return pipeline.execute()[0] > 0
+
+        except RedisError:
             raise AccountSessionMemorySetException()
 
     def remove_short_session(self, account_id: str, access_token: str) -> bool | Exception:
@@ -144,14 +233,177 @@ class AccountSessionMemory(DatabaseRedisDocument):
         :return: true if the item has been removed.
         """
 
+        sessions = self._get_session_keys(account_id, 'short', access_token)
+
+        try:
+            pipeline = self.instance.pipeline()
+
+            pipeline.delete(*sessions)
+
+            pipeline.zrem(self._get_index_key(account_id), *sessions)
+
+            return pipeline.execute()[0] > 0
+
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+    def revoke_all_by_account(self, account_id: str, blacklist: any = None) -> dict | Exception:
+        """
+        Removes every session of an account in one server-side operation.
+
+        :param account_id: a valid account identifier.
+        :param blacklist: optional SecurityBlacklistMemory, the revoked tokens are blacklisted for their remaining time.
+        :return: dictionary with the number of revoked long and short sessions and of blacklisted tokens.
+        """
+
         try:
-            return self.delete(
-                key = f'{self.session_prefix}:{account_id}:short:{access_token}'
+            revoked = self.run_script(
+                'revoke_all',
+                keys = [self._get_index_key(account_id)],
+                args = [self.session_token_prefix]
             )
 
-        except DatabaseRedisSetException:
+        except RedisError:
+            raise AccountSessionMemorySetException()
+
+        # genre, token or its digest with compact keys, remaining milliseconds
+        sessions = [(*session.rsplit(':', 2)[1:], duration) for session, duration in zip(revoked[0::2], revoked[1::2])]
+
+        blacklisted = 0
+
+        if blacklist is not None and sessions:
+            blacklisted = blacklist.add_tokens({ token: duration for genre, token, duration in sessions })
+
+        return {
+            'long': sum(1 for genre, token, duration in sessions if genre == 'long'),
+            'short': sum(1 for genre, token, duration in sessions if genre == 'short'),
+            'blacklisted': blacklisted
+        }
+
+    def migrate_sessions(self, count: int = 1000) -> int | Exception:
+        """
+        Indexes the sessions stored before the session index existed and, with compact keys,
+        renames the sessions still keyed by their full token.
+        Uses SCAN, so it can run on a live database; running it again is harmless.
+
+        :param count: keys examined per SCAN iteration.
+        :return: the number of indexed sessions.
+        """
+
+        indexed = 0
+
+        try:
+            for session in self.instance.scan_iter(match = f'{self.session_prefix}:*:*:*', count = count):
+                _, account_id, genre, token = session.split(':', 3)
+
+                duration = self.instance.ttl(session)
+
+                # already expired or without expiry
+                if duration <= 0:
+                    continue
+
+                if self.compact_keys and not self._is_digest(token):
+                    legacy_session, session = session, self._get_compact_session_key(account_id, genre, token)
+
+                    pipeline = self.instance.pipeline()
+
+                    pipeline.rename(legacy_session, session)
+
+                    pipeline.zrem(self._get_index_key(account_id), legacy_session)
+
+                    if genre == 'long':
+                        pipeline.delete(self._get_legacy_token_key(token))
+
+                    # the session may expire between SCAN and RENAME, skip it then
+                    if any(isinstance(result, Exception) for result in pipeline.execute(raise_on_error = False)):
+                        continue
+
+                # a compact session only knows the digest of its token
+                token_key = None
+
+                if genre == 'long':
+                    token_key = self._get_token_key_by_digest(token) if self._is_digest(token) else self._get_token_key(token)
+
+                self._add_session(account_id, session, None, duration, token_key)
+
+                indexed += 1
+
+            return indexed
+
+        except RedisError:
             raise AccountSessionMemorySetException()
 
+    def _add_session(self, account_id: str, session: str, data: dict | None, duration: int, token_key: str = None) -> bool:
+        # stores the session, its refresh token mapping and its index entry at once
+        return self.run_script(
+            'add_session',
+            keys = [session, self._get_index_key(account_id)] + ([token_key] if token_key else []),
+            args = [duration, time.time(), *self._get_session_args(data)]
+        ) == 1
+
+    def _get_encoded_session(self, session: str) -> dict:
+        try:
+            value = self.raw_instance.get(session)
+
+        except ResponseError as e:
+            # still a hash, stored before the codec was enabled
+            if str(e).startswith('WRONGTYPE'):
+                return self.hgetall(key = session)
+
+            raise
+
+        return self.codec.decode(value) if value is not None else {}
+
+    def _get_session_args(self, data: dict | None) -> list:
+        # None leaves the stored data untouched
+        if data is None:
+            return ['keep']
+
+        if self.codec is None:
+            return ['hash', *self._flatten_mapping(data)]
+
+        return ['value', self.codec.encode(data)]
+
+    def _get_session_key(self, account_id: str, genre: str, token: str) -> str:
+        if self.compact_keys:
+            return self._get_compact_session_key(account_id, genre, token)
+
+        return self._get_legacy_session_key(account_id, genre, token)
+
+    def _get_session_keys(self, account_id: str, genre: str, token: str) -> list:
+        # the session may have been stored before compact keys were enabled
+        if self.compact_keys and self.legacy_keys_fallback:
+            return [self._get_session_key(account_id, genre, token), self._get_legacy_session_key(account_id, genre, token)]
+
+        return [self._get_session_key(account_id, genre, token)]
+
+    def _get_compact_session_key(self, account_id: str, genre: str, token: str) -> str:
+        return f'{self.session_prefix}:{account_id}:{genre}:{self._get_digest(token)}'
+
+    def _get_legacy_session_key(self, account_id: str, genre: str, token: str) -> str:
+        return f'{self.session_prefix}:{account_id}:{genre}:{token}'
+
+    def _get_index_key(self, account_id: str) -> str:
+        return f'{self.session_index_prefix}:{account_id}'
+
+    def _get_token_key(self, refresh_token: str) -> str:
+        if self.compact_keys:
+            return self._get_token_key_by_digest(self._get_digest(refresh_token))
+
+        return self._get_legacy_token_key(refresh_token)
+
+    def _get_token_keys(self, refresh_token: str) -> list:
+        if self.compact_keys and self.legacy_keys_fallback:
+            return [self._get_token_key(refresh_token), self._get_legacy_token_key(refresh_token)]
+
+        return [self._get_token_key(refresh_token)]
+
+    def _get_token_key_by_digest(self, digest: str) -> str:
+        return f'{self.session_token_prefix}:{digest}'
+
+    def _get_legacy_token_key(self, refresh_token: str) -> str:
+        return f'{self.session_token_prefix}:{refresh_token}'
+
 class AccountSessionMemorySetException(Exception):
 
     """
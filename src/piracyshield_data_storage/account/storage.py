@@ -6,6 +6,11 @@ class AccountStorage(DatabaseArangodbDocument):
 
     collection_name = None
 
+    indexes = [
+        { 'fields': ['account_id'] },
+        { 'fields': ['email'] }
+    ]
+
     collection_instance = None
 
     def __init__(self, collection_name: str):
@@ -132,7 +137,7 @@ class AccountStorage(DatabaseArangodbDocument):
         """
 
         try:
-            return self.query(aql, bind_vars = {
+            return self.query(aql, batch_size = 1, bind_vars = {
                 'identifier': identifier
             })
 
@@ -1,16 +1,39 @@
+from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument
+
+import threading
 import time
 
 class BaseStorage(DatabaseArangodbDocument):
 
-    start_counter = 0
-
-    stop_counter = 0
-
     def __init__(self):
         super().__init__()
 
+        # a storage instance can be shared by many threads
+        self._counters = threading.local()
+
     def _start_counter(self):
-        self.start_counter = time.time()
+        self._counters.start = time.perf_counter()
+
+    def _stop_counter(self, name: str = None) -> float:
+        """
+        Stops the counter and records the elapsed time.
+
+        :param name: the measured operation, defaults to the calling method.
+        :return: the elapsed time in seconds, 0 if the counter has not been started.
+        """
+
+        start = getattr(self._counters, 'start', None)
+
+        if start is None:
+            return 0.0
+
+        self._counters.start = None
+
+        elapsed = time.perf_counter() - start
+
+        if self.metrics_enabled:
+            self.metrics.observe('operation_duration_seconds', elapsed, {
+                'method': name or self._get_caller_name()
+            })
 
-    def _stop_counter(self):
-        self.stop_counter = time.time()
+        return elapsed
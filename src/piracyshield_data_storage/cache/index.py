@@ -0,0 +1,297 @@
+import os
+import sqlite3
+import threading
+import time
+
+class CacheIndex:
+
+    """
+    Sidecar index of the cached files, tracking size, expiration and accesses without stat()-ing the files.
+    Backed by SQLite so it is shared by every process using the same cache folder.
+    """
+
+    schema = (
+        '''
+        CREATE TABLE IF NOT EXISTS entries (
+            filename TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            expires_at REAL,
+            digest TEXT
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)',
+        'CREATE INDEX IF NOT EXISTS entries_hits ON entries (hits, accessed_at)',
+        'CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at) WHERE expires_at IS NOT NULL'
+    )
+
+    # order in which entries are evicted for each policy
+    eviction_orders = {
+        'lru': 'accessed_at',
+        'lfu': 'hits, accessed_at'
+    }
+
+    # seconds to wait for a lock held by another process
+    timeout = 30
+
+    # accesses are written in batches, once this many entries or seconds have accumulated
+    touch_batch_size = 100
+
+    touch_interval = 1
+
+    # seconds the size tracked by this process is trusted before reading it again, other processes add entries meanwhile
+    size_interval = 10
+
+    def __init__(self, path: str):
+        """
+        :param path: the SQLite file, created if missing.
+        """
+
+        self.path = path
+
+        self._lock = threading.Lock()
+
+        self._connection = None
+
+        self._pid = None
+
+        self._touches = {}
+
+        self._touches_pid = os.getpid()
+
+        self._touched_at = time.monotonic()
+
+        self._size = None
+
+        self._size_at = 0
+
+        # last sweep of the expired entries by this process, see CacheStorage
+        self.swept_at = 0
+
+    def add(self, filename: str, size: int, ttl: int | None = None, digest: str = None) -> None:
+        """
+        Adds or replaces an entry.
+
+        :param filename: the cached file.
+        :param size: size in bytes.
+        :param ttl: seconds before the entry expires, None to keep it until evicted.
+        :param digest: the content addressed object the file is a name of.
+        """
+
+        now = time.time()
+
+        self._execute(
+            'INSERT OR REPLACE INTO entries (filename, size, created_at, accessed_at, hits, expires_at, digest) VALUES (?, ?, ?, ?, 0, ?, ?)',
+            (filename, size, now, now, now + ttl if ttl else None, digest)
+        )
+
+        # may count a replaced entry twice, which only brings the next exact reading forward
+        if self._size is not None:
+            self._size += size
+
+    def get(self, filename: str) -> dict | None:
+        """
+        Returns an entry.
+
+        :param filename: the cached file.
+        :return: dictionary with size, created_at, accessed_at, hits, expires_at and digest, or None.
+        """
+
+        rows = self._execute('SELECT size, created_at, accessed_at, hits, expires_at, digest FROM entries WHERE filename = ?', (filename,))
+
+        if not rows:
+            return None
+
+        return dict(zip(('size', 'created_at', 'accessed_at', 'hits', 'expires_at', 'digest'), rows[0]))
+
+    def touch(self, filename: str) -> None:
+        """
+        Records an access to an entry, written along with the other accesses by `flush`.
+
+        :param filename: the cached file.
+        """
+
+        with self._lock:
+            touches = self._get_touches()
+
+            accessed_at, hits = touches.get(filename, (0, 0))
+
+            touches[filename] = (time.time(), hits + 1)
+
+            if len(touches) < self.touch_batch_size and time.monotonic() - self._touched_at < self.touch_interval:
+                return
+
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the accesses recorded since the last flush.
+        """
+
+        with self._lock:
+            touches = self._get_touches()
+
+            self._touches = {}
+
+            self._touched_at = time.monotonic()
+
+            if not touches:
+                return
+
+            connection = self._get_connection()
+
+            with connection:
+                connection.executemany(
+                    'UPDATE entries SET accessed_at = MAX(accessed_at, ?), hits = hits + ? WHERE filename = ?',
+                    ((accessed_at, hits, filename) for filename, (accessed_at, hits) in touches.items())
+                )
+
+    def remove(self, filename: str) -> None:
+        """
+        Removes an entry.
+
+        :param filename: the cached file.
+        """
+
+        self._execute('DELETE FROM entries WHERE filename = ?', (filename,))
+
+    def get_size(self) -> int:
+        """
+        Returns the total size of the entries in bytes, counting the content shared by several names once.
+        """
+
+        size = self._execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries GROUP BY digest, CASE WHEN digest IS NULL THEN filename END)'
+        )[0][0]
+
+        self._size = size
+
+        self._size_at = time.monotonic()
+
+        return size
+
+    def get_estimated_size(self) -> int:
+        """
+        Returns the total size read by `get_size`, plus the entries added since by this process.
+        The size is read again every `size_interval` seconds.
+        """
+
+        if self._size is None or time.monotonic() - self._size_at >= self.size_interval:
+            return self.get_size()
+
+        return self._size
+
+    def get_count(self) -> int:
+        """
+        Returns the number of entries.
+        """
+
+        return self._execute('SELECT COUNT(*) FROM entries')[0][0]
+
+    def get_expired(self, limit: int = 1000) -> list:
+        """
+        Returns the expired entries, oldest expiration first.
+
+        :param limit: maximum number of entries.
+        :return: list of filenames.
+        """
+
+        rows = self._execute('SELECT filename FROM entries WHERE expires_at <= ? ORDER BY expires_at LIMIT ?', (time.time(), limit))
+
+        return [filename for filename, in rows]
+
+    def get_candidates(self, policy: str, limit: int = 1000) -> list:
+        """
+        Returns the entries to evict first.
+
+        :param policy: `lru` or `lfu`.
+        :param limit: maximum number of entries.
+        :return: list of (filename, size).
+        """
+
+        self.flush()
+
+        return self._execute(f'SELECT filename, size FROM entries ORDER BY {self.eviction_orders[policy]} LIMIT ?', (limit,))
+
+    def has_entries(self) -> bool:
+        return len(self._execute('SELECT 1 FROM entries LIMIT 1')) > 0
+
+    def rebuild(self, entries: any) -> None:
+        """
+        Replaces the whole index.
+
+        :param entries: list of (filename, size, accessed_at, expires_at, digest), collected beforehand as the index is locked meanwhile.
+        """
+
+        now = time.time()
+
+        with self._lock:
+            connection = self._get_connection()
+
+            with connection:
+                connection.execute('DELETE FROM entries')
+
+                connection.executemany(
+                    'INSERT OR REPLACE INTO entries (filename, size, created_at, accessed_at, hits, expires_at, digest) VALUES (?, ?, ?, ?, 0, ?, ?)',
+                    ((filename, size, now, accessed_at, expires_at, digest) for filename, size, accessed_at, expires_at, digest in entries)
+                )
+
+            self._touches = {}
+
+            self._size = None
+
+    def close(self) -> None:
+        self.flush()
+
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+
+            self._connection = None
+
+    def _execute(self, query: str, parameters: tuple = ()) -> list:
+        with self._lock:
+            connection = self._get_connection()
+
+            with connection:
+                return connection.execute(query, parameters).fetchall()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # connections must not be shared with forked children
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout = self.timeout, check_same_thread = False)
+
+            # readers do not block the writer and the accesses are not worth a full sync
+            self._connection.execute('PRAGMA journal_mode = WAL')
+
+            self._connection.execute('PRAGMA synchronous = NORMAL')
+
+            with self._connection:
+                for statement in self.schema:
+                    self._connection.execute(statement)
+
+                # indexes created before content addressing
+                columns = [column[1] for column in self._connection.execute('PRAGMA table_info(entries)')]
+
+                if 'digest' not in columns:
+                    try:
+                        self._connection.execute('ALTER TABLE entries ADD COLUMN digest TEXT')
+
+                    # added by another process in the meantime
+                    except sqlite3.OperationalError:
+                        pass
+
+            self._pid = os.getpid()
+
+        return self._connection
+
+    def _get_touches(self) -> dict:
+        # accesses recorded by the parent are written by the parent
+        if self._touches_pid != os.getpid():
+            self._touches = {}
+
+            self._touches_pid = os.getpid()
+
+        return self._touches
@@ -1,7 +1,17 @@
 from piracyshield_component.environment import Environment
 from piracyshield_component.log.logger import Logger
 
+from piracyshield_data_storage.cache.index import CacheIndex
+from piracyshield_data_storage.metrics.registry import MetricsRegistry
+
+from contextlib import contextmanager
+from typing import Iterator
+
+import hashlib
+import mmap
 import os
+import tempfile
+import time
 
 # TODO: use custom exceptions.
 
@@ -9,58 +19,480 @@ class CacheStorage:
 
     logger = None
 
-    def __init__(self):
+    # none: leave flushing to the OS, file: flush the file before it replaces the old one,
+    # full: also flush the directory so the rename survives a crash
+    fsync_policies = ('none', 'file', 'full')
+
+    fsync_policy = 'file'
+
+    # bytes read at a time from file-like objects
+    chunk_size = 1024 * 1024
+
+    # prefix and suffix of the files being written
+    temporary_prefix = '.'
+
+    temporary_suffix = '.tmp'
+
+    # temporary files are created private, the final file gets the usual permissions
+    file_mode = 0o644
+
+    # bytes kept in the folder, None for no limit
+    max_size = None
+
+    # seconds before an entry expires, None to keep it until evicted
+    ttl = None
+
+    # seconds between two sweeps of the expired entries on write, those read meanwhile expire on access
+    expiry_interval = 60
+
+    eviction_policies = ('lru', 'lfu')
+
+    eviction_policy = 'lru'
+
+    # levels of subfolders named after the hash of the filename, 0 keeps every file in the cache folder
+    shard_depth = 0
+
+    # hexadecimal characters of each level, 2 gives 256 subfolders per level
+    shard_width = 2
+
+    # look for files cached before sharding was enabled
+    legacy_fallback = True
+
+    # store files once by digest, filenames being hard links to them
+    content_addressed = False
+
+    content_algorithm = 'sha256'
+
+    # folder of the content addressed files, sharded by the first characters of the digest
+    objects_folder = '.objects'
+
+    objects_depth = 2
+
+    # sidecar index, only used when a budget or a ttl is set
+    index_filename = '.index.sqlite'
+
+    index = None
+
+    # index of each cache folder, shared by the storages of this process
+    indexes = {}
+
+    # hits, misses and evictions of every cache storage of this process
+    metrics = MetricsRegistry('cache')
+
+    def __init__(self, fsync_policy: str = None, max_size: int = None, ttl: int = None, eviction_policy: str = None, shard_depth: int = None, content_addressed: bool = None):
+        """
+        :param fsync_policy: one of `fsync_policies`, defaults to `fsync_policy`.
+        :param max_size: bytes kept in the folder before evicting entries, defaults to `max_size`.
+        :param ttl: default seconds before an entry expires, defaults to `ttl`.
+        :param eviction_policy: one of `eviction_policies`, defaults to `eviction_policy`.
+        :param shard_depth: levels of subfolders, defaults to `shard_depth`.
+        :param content_addressed: store identical files once, defaults to `content_addressed`.
+        """
+
         self.logger = Logger('storage')
 
+        if fsync_policy is not None:
+            if fsync_policy not in self.fsync_policies:
+                raise ValueError(f'Unknown fsync policy `{fsync_policy}`')
+
+            self.fsync_policy = fsync_policy
+
+        if eviction_policy is not None:
+            if eviction_policy not in self.eviction_policies:
+                raise ValueError(f'Unknown eviction policy `{eviction_policy}`')
+
+            self.eviction_policy = eviction_policy
+
+        if max_size is not None:
+            self.max_size = max_size
+
+        if ttl is not None:
+            self.ttl = ttl
+
+        if shard_depth is not None:
+            self.shard_depth = shard_depth
+
+        if content_addressed is not None:
+            self.content_addressed = content_addressed
+
         if not os.path.exists(Environment.CACHE_PATH):
             raise FileNotFoundError(f'The specified folder `{Environment.CACHE_PATH}` does not exist')
 
         if not os.path.isdir(Environment.CACHE_PATH):
             raise NotADirectoryError(f'The specified path `{Environment.CACHE_PATH}` is not a directory')
 
-    def write(self, filename: str, content: bytes) -> str | Exception:
+        if self.max_size is not None or self.ttl is not None:
+            self.index = self._get_index()
+
+    def write(self, filename: str, content: bytes, ttl: int = None) -> str | Exception:
+        # return the absolute path
+        return self.write_stream(filename, [content], ttl = ttl)['path']
+
+    def write_stream(self, filename: str, content: any, algorithm: str = None, ttl: int = None) -> dict | Exception:
+        """
+        Writes a file from chunks to a temporary file next to it, then atomically replaces the target.
+        Readers see either the previous file or the complete new one.
+
+        :param filename: the cached file.
+        :param content: an iterable of bytes chunks or a binary file-like object.
+        :param algorithm: hash the content while writing it with any algorithm supported by hashlib, always `content_algorithm` when content addressed.
+        :param ttl: seconds before the entry expires, defaults to `ttl`.
+        :return: dictionary with the absolute path, the size and the hexadecimal digest if requested.
+        """
+
+        path = self._get_absolute_path(filename)
+
+        if self.content_addressed:
+            if algorithm and algorithm != self.content_algorithm:
+                raise ValueError(f'Content addressed files are hashed with `{self.content_algorithm}`')
+
+            algorithm = self.content_algorithm
+
+        digest = hashlib.new(algorithm) if algorithm else None
+
+        size = 0
+
+        try:
+            if self.shard_depth:
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+
+            descriptor, temporary_path = tempfile.mkstemp(
+                dir = os.path.dirname(path),
+                prefix = f'{self.temporary_prefix}{os.path.basename(path)}.',
+                suffix = self.temporary_suffix
+            )
+
+        except IOError:
+            raise IOError(f'Failed to write content to file `{filename}`')
+
+        try:
+            with os.fdopen(descriptor, 'wb') as handle:
+                os.fchmod(handle.fileno(), self.file_mode)
+
+                for chunk in self._get_chunks(content):
+                    handle.write(chunk)
+
+                    size += len(chunk)
+
+                    if digest is not None:
+                        digest.update(chunk)
+
+                if self.fsync_policy != 'none':
+                    handle.flush()
+
+                    os.fsync(handle.fileno())
+
+            if self.content_addressed:
+                self._store_object(temporary_path, digest.hexdigest(), path)
+
+            else:
+                os.replace(temporary_path, path)
+
+            if self.fsync_policy == 'full':
+                self._fsync_directory(os.path.dirname(path))
+
+        except BaseException as e:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+            if isinstance(e, IOError):
+                raise IOError(f'Failed to write content to file `{filename}`')
+
+            raise
+
+        self._register(filename, size, ttl, digest.hexdigest() if self.content_addressed else None)
+
+        return {
+            'path': path,
+            'size': size,
+            'digest': digest.hexdigest() if digest is not None else None
+        }
+
+    def link(self, filename: str, digest: str, ttl: int = None) -> str | Exception:
+        """
+        Names content already cached, without writing it again.
+
+        :param filename: the new name.
+        :param digest: the content addressed file.
+        :param ttl: seconds before the entry expires, defaults to `ttl`.
+        :return: the absolute path.
+        """
+
         path = self._get_absolute_path(filename)
 
+        # recorded in the index as written, in lower case
+        digest = digest.lower()
+
+        object_path = self._get_object_path(digest)
+
         try:
-            with open(path, 'wb') as handle:
-                handle.write(content)
+            size = os.stat(object_path).st_size
+
+            if self.shard_depth:
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+
+            self._link(object_path, path)
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f'The specified digest `{digest}` does not exist')
 
         except IOError:
             raise IOError(f'Failed to write content to file `{filename}`')
 
-        # return the absolute path
+        self._register(filename, size, ttl, digest)
+
         return path
 
+    def exists_digest(self, digest: str) -> bool:
+        """
+        Checks for content already cached, e.g. a re-uploaded archive.
+
+        :param digest: hexadecimal digest computed with `content_algorithm`.
+        :return: whether the content is cached.
+        """
+
+        return os.path.exists(self._get_object_path(digest))
+
+    def get_by_digest(self, digest: str) -> str | Exception:
+        return self._get_object_path(digest)
+
+    def get_references(self, digest: str) -> int:
+        """
+        Counts the names of a content addressed file.
+
+        :param digest: the content addressed file.
+        :return: number of names, 0 when not cached.
+        """
+
+        try:
+            # the object itself is one of the links
+            return os.stat(self._get_object_path(digest)).st_nlink - 1
+
+        except FileNotFoundError:
+            return 0
+
+    def collect(self) -> int | Exception:
+        """
+        Removes the content addressed files no name refers to anymore.
+        Those are left behind by names replaced or removed while the index was disabled.
+
+        :return: number of removed files.
+        """
+
+        removed = 0
+
+        try:
+            for directory, folders, filenames in os.walk(os.path.join(Environment.CACHE_PATH, self.objects_folder)):
+                for filename in filenames:
+                    if self._release_object_path(os.path.join(directory, filename)):
+                        removed += 1
+
+        except IOError:
+            raise IOError(f'Failed to get files from folder `{self.objects_folder}`')
+
+        return removed
+
     def get(self, filename: str) -> str | Exception:
-        return self._get_absolute_path(filename)
+        return self._find_absolute_path(filename)
 
-    def read(self, filename: str) -> bytes | Exception:
-        path = self._get_absolute_path(filename)
+    def read(self, filename: str) -> str | Exception:
+        """
+        Reads a whole file as text, see `read_bytes` for binary content.
+
+        :param filename: the cached file.
+        :return: the decoded content.
+        """
+
+        return self._read(filename, 'r')
+
+    def read_bytes(self, filename: str) -> bytes | Exception:
+        """
+        Reads a whole file as bytes.
+
+        :param filename: the cached file.
+        :return: the content.
+        """
+
+        return self._read(filename, 'rb')
+
+    @contextmanager
+    def open_buffer(self, filename: str) -> memoryview | Exception:
+        """
+        Maps a file in memory, read-only, without copying it into the heap.
+        The view is only valid inside the `with` block, slices kept past it hold the mapping open until released.
+
+        :param filename: the cached file.
+        :return: a context manager yielding a memoryview of the file.
+        """
+
+        path = self._find_absolute_path(filename)
+
+        self._expire(filename)
 
         try:
-            with open(path, 'r') as handle:
-                return handle.read()
+            handle = open(path, 'rb')
 
         except FileNotFoundError:
+            self._record_miss()
+
             raise FileNotFoundError(f'The specified file `{filename}` does not exist')
 
         except IOError:
             raise IOError(f'Failed to read content from file `{filename}`')
 
+        self._record_hit(filename)
+
+        with handle:
+            # empty files cannot be mapped
+            if os.fstat(handle.fileno()).st_size == 0:
+                yield memoryview(b'')
+
+                return
+
+            try:
+                buffer = mmap.mmap(handle.fileno(), 0, access = mmap.ACCESS_READ)
+
+            except (IOError, ValueError):
+                raise IOError(f'Failed to read content from file `{filename}`')
+
+            view = memoryview(buffer)
+
+            try:
+                yield view
+
+            finally:
+                view.release()
+
+                try:
+                    buffer.close()
+
+                # slices still exported by the caller, the mapping is closed once they are garbage collected
+                except BufferError:
+                    pass
+
+    def read_range(self, filename: str, offset: int, length: int) -> bytes | Exception:
+        """
+        Reads part of a file with a single positioned read.
+
+        :param filename: the cached file.
+        :param offset: first byte to read.
+        :param length: maximum number of bytes to read, less are returned at the end of the file.
+        :return: the requested bytes.
+        """
+
+        path = self._find_absolute_path(filename)
+
+        self._expire(filename)
+
+        try:
+            descriptor = os.open(path, os.O_RDONLY)
+
+        except FileNotFoundError:
+            self._record_miss()
+
+            raise FileNotFoundError(f'The specified file `{filename}` does not exist')
+
+        except IOError:
+            raise IOError(f'Failed to read content from file `{filename}`')
+
+        self._record_hit(filename)
+
+        try:
+            return os.pread(descriptor, length, offset)
+
+        except IOError:
+            raise IOError(f'Failed to read content from file `{filename}`')
+
+        finally:
+            os.close(descriptor)
+
+    def get_digest(self, filename: str, algorithm: str = 'sha256') -> str | Exception:
+        """
+        Hashes a file straight from its memory mapping.
+
+        :param filename: the cached file.
+        :param algorithm: any algorithm supported by hashlib.
+        :return: the hexadecimal digest.
+        """
+
+        digest = hashlib.new(algorithm)
+
+        with self.open_buffer(filename) as buffer:
+            digest.update(buffer)
+
+        return digest.hexdigest()
+
     def exists(self, filename: str) -> bool:
-        path = self._get_absolute_path(filename)
+        path = self._find_absolute_path(filename)
+
+        self._expire(filename)
 
         return os.path.exists(path)
 
     def get_all(self) -> list | Exception:
+        return [entry['filename'] for entry in self.scan()]
+
+    def scan(self) -> Iterator[dict] | Exception:
+        """
+        Lazily lists the cached files of both layouts, with the metadata returned by os.scandir.
+        Files still being written and the index are left out.
+
+        :return: iterator of dictionaries with filename, path, size, modified_at, accessed_at and inode.
+        """
+
         try:
-            return os.listdir(Environment.CACHE_PATH)
+            yield from self._scan(Environment.CACHE_PATH, 0)
 
         except IOError:
             raise IOError(f'Failed to get files from folder `{Environment.CACHE_PATH}`')
 
+    def migrate_layout(self) -> int | Exception:
+        """
+        Moves the files cached in the cache folder into their shard.
+
+        :return: number of moved files.
+        """
+
+        if not self.shard_depth:
+            return 0
+
+        # collected first, the folder changes while moving
+        filenames = [entry['filename'] for entry in self.scan() if entry['path'] == self._get_legacy_path(entry['filename'])]
+
+        moved = 0
+
+        for filename in filenames:
+            path = self._get_absolute_path(filename)
+
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+
+                # a copy written after sharding was enabled is newer
+                if os.path.exists(path):
+                    os.remove(self._get_legacy_path(filename))
+
+                    continue
+
+                os.rename(self._get_legacy_path(filename), path)
+
+            except FileNotFoundError:
+                # removed in the meantime
+                continue
+
+            except IOError:
+                raise IOError(f'Failed to move file `{filename}`')
+
+            moved += 1
+
+        if moved and self.fsync_policy == 'full':
+            self._fsync_directory(Environment.CACHE_PATH)
+
+        return moved
+
     def remove(self, filename: str) -> bool | Exception:
-        path = self._get_absolute_path(filename)
+        path = self._find_absolute_path(filename)
+
+        digest = self._get_name_digest(filename, path) if self.content_addressed else None
 
         try:
             os.remove(path)
@@ -71,7 +503,398 @@ class CacheStorage:
         except IOError:
             raise IOError(f'Failed to remove file `{filename}`.')
 
+        if self.index is not None:
+            self.index.remove(filename)
+
+        if digest is not None:
+            self._release_object(digest)
+
         return True
 
-    def _get_absolute_path(self, filename: str) -> str:
+    def evict(self, exclude: str = None) -> int:
+        """
+        Removes the expired entries, then the least recently or frequently used ones until the folder fits `max_size`.
+
+        :param exclude: a file that must be kept.
+        :return: number of evicted entries.
+        """
+
+        if self.index is None:
+            return 0
+
+        evicted = self._evict_expired()
+
+        if self.max_size is None:
+            return evicted
+
+        return evicted + self._evict_size(exclude)
+
+    def rebuild_index(self) -> None:
+        """
+        Indexes the files already in the folder, using their last access time.
+        """
+
+        if self.index is None:
+            return
+
+        expires_at = time.time() + self.ttl if self.ttl else None
+
+        # the names of a content addressed object are hard links sharing its inode
+        objects = self._get_objects() if self.content_addressed else {}
+
+        # walked before the index write lock is taken, other processes would wait for the whole walk otherwise
+        entries = [(entry['filename'], entry['size'], entry['accessed_at'], expires_at, objects.get(entry['inode'])) for entry in self.scan()]
+
+        self.index.rebuild(entries)
+
+    def get_stats(self) -> dict:
+        """
+        Returns the size of the folder and the counters of this process.
+
+        :return: dictionary with entries, size, max_size, hits, misses and evictions.
+        """
+
+        counters = {}
+
+        for counter in self.metrics.dump()['counters']:
+            counters[counter['name']] = counters.get(counter['name'], 0) + counter['value']
+
+        return {
+            'entries': self.index.get_count() if self.index is not None else None,
+            'size': self.index.get_size() if self.index is not None else None,
+            'max_size': self.max_size,
+            'hits': counters.get('hits_total', 0),
+            'misses': counters.get('misses_total', 0),
+            'evictions': counters.get('evictions_total', 0)
+        }
+
+    def _read(self, filename: str, mode: str) -> str | bytes:
+        path = self._find_absolute_path(filename)
+
+        self._expire(filename)
+
+        try:
+            with open(path, mode) as handle:
+                content = handle.read()
+
+        except FileNotFoundError:
+            self._record_miss()
+
+            raise FileNotFoundError(f'The specified file `{filename}` does not exist')
+
+        except IOError:
+            raise IOError(f'Failed to read content from file `{filename}`')
+
+        self._record_hit(filename)
+
+        return content
+
+    def _get_chunks(self, content: any) -> any:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return [content]
+
+        # file-like objects are read a chunk at a time
+        if hasattr(content, 'read'):
+            return iter(lambda: content.read(self.chunk_size), b'')
+
+        return content
+
+    def _fsync_directory(self, path: str) -> None:
+        descriptor = os.open(path, os.O_RDONLY)
+
+        try:
+            os.fsync(descriptor)
+
+        finally:
+            os.close(descriptor)
+
+    def _get_index(self) -> CacheIndex:
+        path = os.path.join(Environment.CACHE_PATH, self.index_filename)
+
+        index = self.indexes.get(path)
+
+        if index is None:
+            index = self.indexes[path] = CacheIndex(path)
+
+        self.index = index
+
+        # files cached before the index existed
+        if not index.has_entries():
+            self.rebuild_index()
+
+        return index
+
+    def _expire(self, filename: str) -> None:
+        # expired entries are evicted when accessed, so they read as missing
+        if self.index is None:
+            return
+
+        entry = self.index.get(filename)
+
+        if entry is not None and entry['expires_at'] is not None and entry['expires_at'] <= time.time():
+            self._evict(filename, 'expired')
+
+    def _evict(self, filename: str, reason: str) -> bool:
+        # returns whether the space of the entry is freed
+        path = self._find_absolute_path(filename)
+
+        digest = self._get_name_digest(filename, path) if self.content_addressed else None
+
+        try:
+            os.remove(path)
+
+        except FileNotFoundError:
+            pass
+
+        except IOError:
+            raise IOError(f'Failed to remove file `{filename}`.')
+
+        self.index.remove(filename)
+
+        self.metrics.increment('evictions_total', { 'reason': reason })
+
+        return self._release_object(digest) if digest is not None else True
+
+    def _evict_expired(self) -> int:
+        evicted = 0
+
+        while True:
+            expired = self.index.get_expired()
+
+            if not expired:
+                return evicted
+
+            for filename in expired:
+                self._evict(filename, 'expired')
+
+                evicted += 1
+
+    def _evict_size(self, exclude: str | None) -> int:
+        evicted = 0
+
+        size = self.index.get_size()
+
+        while size > self.max_size:
+            candidates = [(filename, entry_size) for filename, entry_size in self.index.get_candidates(self.eviction_policy) if filename != exclude]
+
+            if not candidates:
+                break
+
+            for filename, entry_size in candidates:
+                if size <= self.max_size:
+                    break
+
+                # content still named by other entries stays
+                if self._evict(filename, self.eviction_policy):
+                    size -= entry_size
+
+                evicted += 1
+
+        return evicted
+
+    def _register(self, filename: str, size: int, ttl: int | None, digest: str | None) -> None:
+        # the sharded copy replaces the one cached before sharding
+        if self.shard_depth and self.legacy_fallback:
+            self._remove_legacy(filename)
+
+        if self.index is None:
+            return
+
+        previous = self.index.get(filename)
+
+        self.index.add(filename, size, ttl if ttl is not None else self.ttl, digest)
+
+        # the replaced content may not be named anymore
+        if previous is not None and previous['digest'] is not None and previous['digest'] != digest:
+            self._release_object(previous['digest'])
+
+        # the expired entries are swept from time to time, those read meanwhile expire on access
+        if time.monotonic() - self.index.swept_at >= self.expiry_interval:
+            self.index.swept_at = time.monotonic()
+
+            self._evict_expired()
+
+        # the size is only aggregated again once the estimate crosses the budget, the new entry is kept even if it does not fit alone
+        if self.max_size is not None and self.index.get_estimated_size() > self.max_size:
+            self._evict_size(exclude = filename)
+
+    def _store_object(self, temporary_path: str, digest: str, path: str) -> None:
+        object_path = self._get_object_path(digest)
+
+        os.makedirs(os.path.dirname(object_path), exist_ok = True)
+
+        while True:
+            # identical content is already stored
+            try:
+                os.link(temporary_path, object_path)
+
+            except FileExistsError:
+                pass
+
+            try:
+                self._link(object_path, path)
+
+                break
+
+            # collected in the meantime, store it again
+            except FileNotFoundError:
+                continue
+
+        os.remove(temporary_path)
+
+        if self.fsync_policy == 'full':
+            self._fsync_directory(os.path.dirname(object_path))
+
+    def _link(self, source: str, path: str) -> None:
+        # links under a temporary name first, as a link cannot replace an existing file
+        temporary_path = os.path.join(
+            os.path.dirname(path),
+            f'{self.temporary_prefix}{os.path.basename(path)}.{os.urandom(4).hex()}{self.temporary_suffix}'
+        )
+
+        os.link(source, temporary_path)
+
+        try:
+            os.replace(temporary_path, path)
+
+        except BaseException:
+            os.remove(temporary_path)
+
+            raise
+
+    def _release_object(self, digest: str) -> bool:
+        return self._release_object_path(self._get_object_path(digest))
+
+    def _release_object_path(self, object_path: str) -> bool:
+        # removes an object once it is its only link, returns whether it is gone
+        try:
+            if os.stat(object_path).st_nlink > 1:
+                return False
+
+            os.remove(object_path)
+
+        except FileNotFoundError:
+            pass
+
+        return True
+
+    def _get_name_digest(self, filename: str, path: str) -> str | None:
+        if self.index is not None:
+            entry = self.index.get(filename)
+
+            if entry is not None and entry['digest'] is not None:
+                return entry['digest']
+
+        # only the last name needs hashing to find its object, the others keep it referenced
+        try:
+            if os.stat(path).st_nlink != 2:
+                return None
+
+        except FileNotFoundError:
+            return None
+
+        digest = hashlib.new(self.content_algorithm)
+
+        with open(path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(self.chunk_size), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _get_objects(self) -> dict:
+        # digest of the content addressed objects by inode
+        objects = {}
+
+        for folder, folders, filenames in os.walk(os.path.join(Environment.CACHE_PATH, self.objects_folder)):
+            for filename in filenames:
+                try:
+                    objects[os.stat(os.path.join(folder, filename)).st_ino] = filename
+
+                except FileNotFoundError:
+                    continue
+
+        return objects
+
+    def _get_object_path(self, digest: str) -> str:
+        # digests may come from the callers, e.g. a hash_string in upper case
+        digest = digest.lower()
+
+        if not digest or any(character not in '0123456789abcdef' for character in digest):
+            raise ValueError(f'Invalid digest `{digest}`')
+
+        shards = [digest[level * self.shard_width:(level + 1) * self.shard_width] for level in range(self.objects_depth)]
+
+        return os.path.join(Environment.CACHE_PATH, self.objects_folder, *shards, digest)
+
+    def _record_hit(self, filename: str) -> None:
+        self.metrics.increment('hits_total')
+
+        if self.index is not None:
+            self.index.touch(filename)
+
+    def _record_miss(self) -> None:
+        self.metrics.increment('misses_total')
+
+    def _is_internal(self, filename: str) -> bool:
+        return self._is_temporary(filename) or filename.startswith(self.index_filename)
+
+    def _is_temporary(self, filename: str) -> bool:
+        return filename.startswith(self.temporary_prefix) and filename.endswith(self.temporary_suffix)
+
+    def _scan(self, path: str, depth: int) -> Iterator[dict]:
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks = False):
+                    if depth < self.shard_depth and self._is_shard(entry.name):
+                        yield from self._scan(entry.path, depth + 1)
+
+                    continue
+
+                if not entry.is_file() or self._is_internal(entry.name):
+                    continue
+
+                stat = entry.stat()
+
+                yield {
+                    'filename': entry.name,
+                    'path': entry.path,
+                    'size': stat.st_size,
+                    'modified_at': stat.st_mtime,
+                    'accessed_at': stat.st_atime,
+                    'inode': stat.st_ino
+                }
+
+    def _remove_legacy(self, filename: str) -> None:
+        try:
+            os.remove(self._get_legacy_path(filename))
+
+        except FileNotFoundError:
+            pass
+
+    def _is_shard(self, name: str) -> bool:
+        return len(name) == self.shard_width and all(character in '0123456789abcdef' for character in name)
+
+    def _get_shards(self, filename: str) -> list:
+        digest = hashlib.blake2b(filename.encode(), digest_size = 16).hexdigest()
+
+        return [digest[level * self.shard_width:(level + 1) * self.shard_width] for level in range(self.shard_depth)]
+
+    def _find_absolute_path(self, filename: str) -> str:
+        # the flat path is only checked when the sharded one is missing
+        path = self._get_absolute_path(filename)
+
+        if not self.shard_depth or not self.legacy_fallback or os.path.exists(path):
+            return path
+
+        legacy_path = self._get_legacy_path(filename)
+
+        return legacy_path if os.path.exists(legacy_path) else path
+
+    def _get_legacy_path(self, filename: str) -> str:
         return os.path.join(Environment.CACHE_PATH, filename)
+
+    def _get_absolute_path(self, filename: str) -> str:
+        if not self.shard_depth:
+            return os.path.join(Environment.CACHE_PATH, filename)
+
+        return os.path.join(Environment.CACHE_PATH, *self._get_shards(filename), filename)
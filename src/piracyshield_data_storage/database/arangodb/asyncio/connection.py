@@ -0,0 +1,100 @@
+from piracyshield_data_storage.database.arangodb.connection import DatabaseArangodbConnection
+
+from arangoasync import ArangoClient
+from arangoasync.auth import Auth
+from arangoasync.http import AioHTTPClient
+
+from aiohttp import TCPConnector
+
+import asyncio
+import os
+import weakref
+
+class DatabaseArangodbAsyncConnection(DatabaseArangodbConnection):
+
+    """
+    Asyncio counterpart of the ArangoDB connection.
+    The handles are created on first use in each event loop, so storages can be built outside of one.
+    """
+
+    # shared by every async storage of this process, the clients of a loop are dropped with it
+    _databases = weakref.WeakKeyDictionary()
+
+    _pid = os.getpid()
+
+    def __init__(self, as_root = False):
+        self._prepare_configs()
+
+        self._prepare_settings()
+
+        self._prepare_credentials(as_root)
+
+    async def establish(self):
+        await self._get_database()
+
+    @property
+    def instance(self) -> any:
+        """
+        The database handle of the running event loop, None until it has been established in this loop.
+        """
+
+        try:
+            loop = asyncio.get_running_loop()
+
+        except RuntimeError:
+            return None
+
+        # handles opened by the parent process are dropped on the next establish
+        if DatabaseArangodbAsyncConnection._pid != os.getpid():
+            return None
+
+        database = DatabaseArangodbAsyncConnection._databases.get(loop, {}).get(self._get_key())
+
+        return database[1] if database else None
+
+    async def close(self) -> None:
+        """
+        Closes the clients opened in the running event loop by every async storage, to be awaited before the loop shuts down.
+        """
+
+        clients = DatabaseArangodbAsyncConnection._databases.pop(asyncio.get_running_loop(), {})
+
+        for client, database in clients.values():
+            await client.close()
+
+    async def _get_database(self) -> any:
+        # a forked child must not reuse the sockets of its parent
+        if DatabaseArangodbAsyncConnection._pid != os.getpid():
+            DatabaseArangodbAsyncConnection._pid = os.getpid()
+
+            DatabaseArangodbAsyncConnection._databases = weakref.WeakKeyDictionary()
+
+        # aiohttp sessions are bound to the loop that created them
+        databases = DatabaseArangodbAsyncConnection._databases.setdefault(asyncio.get_running_loop(), {})
+
+        key = self._get_key()
+
+        if key in databases:
+            return databases[key][1]
+
+        client = ArangoClient(
+            hosts = f'{self.protocol}://{self.host}:{self.port}',
+            http_client = AioHTTPClient(
+                connector = TCPConnector(limit = self.pool_size)
+            )
+        )
+
+        database = await client.db(
+            self.database,
+            auth = Auth(username = self.username, password = self.password),
+            verify = self.verify
+        )
+
+        # another coroutine of this loop may have connected in the meantime
+        if databases.setdefault(key, (client, database))[0] is not client:
+            await client.close()
+
+        return databases[key][1]
+
+    def _get_key(self) -> tuple:
+        return (self.protocol, self.host, self.port, self.database, self.username, self.password, self.pool_size)
@@ -0,0 +1,88 @@
+from piracyshield_data_storage.database.arangodb.asyncio.connection import DatabaseArangodbAsyncConnection
+from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument, DatabaseArangodbCollectionNotFoundException, DatabaseArangodbQueryException
+
+from arangoasync.exceptions import AQLQueryExecuteError, CursorNextError
+
+from typing import AsyncIterator
+
+import time
+
+class DatabaseArangodbAsyncDocument(DatabaseArangodbAsyncConnection):
+
+    """
+    Asyncio counterpart of DatabaseArangodbDocument.
+    """
+
+    max_batch_size = DatabaseArangodbDocument.max_batch_size
+
+    stream_batch_size = DatabaseArangodbDocument.stream_batch_size
+
+    # shared with the synchronous storages
+    metrics = DatabaseArangodbDocument.metrics
+
+    metrics_enabled = DatabaseArangodbDocument.metrics_enabled
+
+    _layer_modules = DatabaseArangodbDocument._layer_modules
+
+    _get_caller_name = DatabaseArangodbDocument._get_caller_name
+
+    async def collection(self, collection):
+        if self.instance is None:
+            await self.establish()
+
+        try:
+            return self.instance.collection(collection)
+
+        except:
+            raise DatabaseArangodbCollectionNotFoundException()
+
+    async def query(self, aql, batch_size = None, stream = False, **kwargs):
+        if self.instance is None:
+            await self.establish()
+
+        name = self._get_caller_name() if self.metrics_enabled else None
+
+        start = time.perf_counter()
+
+        try:
+            cursor = await self.instance.aql.execute(
+                aql,
+                batch_size = batch_size or self.max_batch_size,
+                options = { 'stream': stream },
+                **kwargs
+            )
+
+        except AQLQueryExecuteError:
+            if self.metrics_enabled:
+                self.metrics.increment('query_errors_total', { 'method': name })
+
+            raise DatabaseArangodbQueryException()
+
+        if self.metrics_enabled:
+            self.metrics.increment('queries_total', { 'method': name })
+
+            self.metrics.observe('query_duration_seconds', time.perf_counter() - start, { 'method': name })
+
+        return cursor
+
+    async def iterate(self, aql, batch_size = None, stream = True, **kwargs) -> AsyncIterator[any]:
+        """
+        Iterates over large results without materialising them on the coordinator.
+
+        :param aql: the query.
+        :param batch_size: rows per batch, defaults to `stream_batch_size`.
+        :param stream: execute the query in stream mode.
+        :return: an async iterator over the rows.
+        """
+
+        cursor = await self.query(aql, batch_size = batch_size or self.stream_batch_size, stream = stream, **kwargs)
+
+        try:
+            async for row in cursor:
+                yield row
+
+        except CursorNextError:
+            raise DatabaseArangodbQueryException()
+
+        finally:
+            await cursor.close(ignore_missing = True)
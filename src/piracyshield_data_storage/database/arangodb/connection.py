@@ -1,6 +1,6 @@
 from piracyshield_component.config import Config
 
-from arango import ArangoClient
+from piracyshield_data_storage.database.arangodb.registry import DatabaseArangodbConnectionRegistry
 
 class DatabaseArangodbConnection:
 
@@ -8,6 +8,11 @@ class DatabaseArangodbConnection:
 
     database_config = None
 
+    # shared by every storage of this process
+    registry = DatabaseArangodbConnectionRegistry()
+
+    default_pool_size = 10
+
     def __init__(self, as_root = False):
         self._prepare_configs()
 
@@ -18,9 +23,14 @@ class DatabaseArangodbConnection:
         self.establish()
 
     def establish(self):
-        client = ArangoClient(hosts = f'{self.protocol}://{self.host}:{self.port}')
-
-        self.instance = client.db(self.database, self.username, self.password, self.verify)
+        self.instance = self.registry.get(
+            hosts = f'{self.protocol}://{self.host}:{self.port}',
+            database = self.database,
+            username = self.username,
+            password = self.password,
+            verify = self.verify,
+            pool_size = self.pool_size
+        )
 
     def _prepare_settings(self):
         connection = self.database_config.get('connection')
@@ -43,6 +53,12 @@ class DatabaseArangodbConnection:
         except KeyError:
             DatabaseArangodbConnectionException('Cannot find the database name')
 
+        # optional, number of keep-alive HTTP connections per host
+        self.pool_size = connection.get('pool_size', self.default_pool_size)
+
+        # optional, queries slower than this many seconds are logged with their execution plan
+        self.slow_query_threshold = connection.get('slow_query_threshold')
+
     def _prepare_credentials(self, as_root):
         credentials = self.database_config.get('root_credentials') if as_root else self.database_config.get('user_credentials')
 
@@ -55,7 +71,11 @@ class DatabaseArangodbConnection:
             DatabaseArangodbConnectionException('Cannot find the database credentials')
 
     def _prepare_configs(self):
-        self.database_config = Config('database/arangodb')
+        # parse the configuration only once per process
+        if DatabaseArangodbConnection.database_config is None:
+            DatabaseArangodbConnection.database_config = Config('database/arangodb')
+
+        self.database_config = DatabaseArangodbConnection.database_config
 
 class DatabaseArangodbConnectionException(Exception):
 
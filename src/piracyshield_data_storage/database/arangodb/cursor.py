@@ -0,0 +1,127 @@
+from arango.cursor import Cursor
+from arango.exceptions import CursorCloseError
+
+import queue
+import threading
+
+class DatabaseArangodbPrefetchCursor:
+
+    """
+    Iterates a cursor while a background thread fetches its next batches.
+    The thread starts with the iteration; a cursor that is not fully iterated must be closed,
+    directly or as a context manager.
+    """
+
+    # marks the end of the results
+    _end = object()
+
+    def __init__(self, cursor: Cursor, depth: int = 1):
+        """
+        :param cursor: a cursor, usually opened in stream mode.
+        :param depth: number of batches fetched ahead of the consumer.
+        """
+
+        self._cursor = cursor
+
+        self._batches = queue.Queue(maxsize = depth)
+
+        self._closed = threading.Event()
+
+        self._thread = None
+
+    def __iter__(self):
+        if self._closed.is_set():
+            return
+
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._fetch, daemon = True)
+
+            self._thread.start()
+
+        try:
+            while True:
+                batch = self._batches.get()
+
+                if batch is self._end:
+                    return
+
+                if isinstance(batch, Exception):
+                    raise DatabaseArangodbPrefetchCursorException() from batch
+
+                yield from batch
+
+        finally:
+            self.close()
+
+    def __enter__(self) -> 'DatabaseArangodbPrefetchCursor':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # never iterated, the server cursor would otherwise stay open until it times out
+        try:
+            self.close()
+
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """
+        Stops fetching and releases the cursor on the server.
+        """
+
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        try:
+            self._cursor.close(ignore_missing = True)
+
+        except CursorCloseError:
+            pass
+
+    def _fetch(self) -> None:
+        # only this thread touches the cursor until it is closed
+        try:
+            while not self._closed.is_set():
+                batch = list(self._cursor.batch())
+
+                self._cursor.batch().clear()
+
+                self._put(batch)
+
+                if not self._cursor.has_more():
+                    break
+
+                self._cursor.fetch()
+
+            self._put(self._end)
+
+        # connection and cursor state errors included, the consumer would wait forever otherwise
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item: any) -> None:
+        # waits for the consumer unless it has given up
+        while not self._closed.is_set():
+            try:
+                self._batches.put(item, timeout = 0.1)
+
+                return
+
+            except queue.Full:
+                continue
+
+class DatabaseArangodbPrefetchCursorException(Exception):
+
+    """
+    Cannot fetch the next batch.
+    """
+
+    pass
@@ -1,11 +1,61 @@
 from piracyshield_data_storage.database.arangodb.connection import DatabaseArangodbConnection
+from piracyshield_data_storage.database.arangodb.cursor import DatabaseArangodbPrefetchCursor
+from piracyshield_data_storage.metrics.registry import MetricsRegistry
 
-from arango.exceptions import AQLQueryExecuteError
+from piracyshield_component.log.logger import Logger
+
+from arango.exceptions import AQLQueryExecuteError, AQLQueryExplainError
+
+import json
+import sys
+import threading
+import time
 
 class DatabaseArangodbDocument(DatabaseArangodbConnection):
 
     max_batch_size = 50000
 
+    stream_batch_size = 1000
+
+    sequence_collection_name = 'sequences'
+
+    # seconds after which a revision reserved by a writer that never released it stops holding back the readers
+    revision_timeout = 300
+
+    # persistent indexes needed by the queries of the storage, see DatabaseArangodbIndex
+    indexes = []
+
+    # when enabled, the last execution of every storage method is kept so it can be explained later
+    catalog_enabled = False
+
+    # characters of the string bind variables kept by the catalog
+    catalog_string_length = 256
+
+    catalog = {}
+
+    # rows of the queries run by `query_cached`, with the collection revision they were read at
+    _query_cache = {}
+
+    # per storage method query statistics, shared by every storage of this process
+    metrics = MetricsRegistry('arangodb')
+
+    # off by default, naming the storage method walks the stack on every query
+    metrics_enabled = False
+
+    logger = None
+
+    # a slow method is explained at most once in this many seconds
+    slow_query_explain_interval = 60
+
+    _slow_query_explained = {}
+
+    _slow_query_lock = threading.Lock()
+
+    _layer_modules = (
+        'piracyshield_data_storage.database.',
+        'piracyshield_data_storage.base'
+    )
+
     def collection(self, collection):
         try:
             return self.instance.collection(collection)
@@ -13,13 +63,320 @@ class DatabaseArangodbDocument(DatabaseArangodbConnection):
         except:
             raise DatabaseArangodbCollectionNotFoundException()
 
-    def query(self, aql, **kwargs):
+    def query(self, aql, batch_size = None, **kwargs):
+        name = self._get_caller_name() if self.metrics_enabled or self.catalog_enabled else None
+
+        if self.catalog_enabled:
+            DatabaseArangodbDocument.catalog[name] = (aql, self._get_sample(kwargs.get('bind_vars')))
+
+        start = time.perf_counter()
+
         try:
-            return self.instance.aql.execute(aql, batch_size = self.max_batch_size, **kwargs)
+            cursor = self.instance.aql.execute(aql, batch_size = batch_size or self.max_batch_size, **kwargs)
 
         except AQLQueryExecuteError:
+            if self.metrics_enabled:
+                self.metrics.increment('query_errors_total', { 'method': name })
+
+            raise DatabaseArangodbQueryException()
+
+        duration = time.perf_counter() - start
+
+        if self.metrics_enabled:
+            self._record_query(name, cursor, duration)
+
+        if self.slow_query_threshold is not None and duration >= self.slow_query_threshold:
+            self._log_slow_query(name or self._get_caller_name(), aql, kwargs.get('bind_vars'), duration)
+
+        return cursor
+
+    def query_cached(self, collection: any, aql: str, bind_vars: dict = None) -> list:
+        """
+        Runs a read query again only when the collection has changed since its last run.
+        Checking the collection revision is a single lookup on the server, unlike scans such as a COLLECT.
+
+        :param collection: the collection read by the query.
+        :param aql: the query.
+        :param bind_vars: the bind variables of the query.
+        :return: the rows.
+        """
+
+        key = (aql, json.dumps(bind_vars, sort_keys = True))
+
+        revision = collection.revision()
+
+        cached = DatabaseArangodbDocument._query_cache.get(key)
+
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+
+        rows = list(self.query(aql, bind_vars = bind_vars))
+
+        DatabaseArangodbDocument._query_cache[key] = (revision, rows)
+
+        return rows
+
+    def iterate(self, aql, batch_size = None, stream = True, prefetch = True, **kwargs):
+        """
+        Iterates over large results without materialising them on the coordinator.
+        In stream mode the query runs lazily on the server as the batches are requested.
+
+        :param aql: the query.
+        :param batch_size: rows per batch, defaults to `stream_batch_size`.
+        :param stream: execute the query in stream mode.
+        :param prefetch: fetch the next batch on a background thread while the current one is consumed.
+        :return: an iterable over the rows.
+        """
+
+        cursor = self.query(aql, batch_size = batch_size or self.stream_batch_size, stream = stream, **kwargs)
+
+        if prefetch:
+            return DatabaseArangodbPrefetchCursor(cursor)
+
+        return cursor
+
+    def explain(self, aql: str, bind_vars: dict = None) -> dict | Exception:
+        """
+        Returns the execution plan chosen by the optimizer.
+
+        :param aql: the query.
+        :param bind_vars: the bind variables of the query.
+        :return: the execution plan.
+        """
+
+        try:
+            return self.instance.aql.explain(aql, bind_vars = bind_vars)
+
+        except AQLQueryExplainError:
             raise DatabaseArangodbQueryException()
 
+    def get_plan_summary(self, plan: dict) -> dict:
+        """
+        Extracts the collections scanned in full and the indexes used by an execution plan.
+
+        :param plan: an execution plan returned by `explain`.
+        :return: dictionary with `full_scans` and `indexes`.
+        """
+
+        full_scans = []
+
+        indexes = []
+
+        for node in plan.get('nodes', []):
+            if node.get('type') == 'EnumerateCollectionNode':
+                full_scans.append(node.get('collection'))
+
+            elif node.get('type') == 'IndexNode':
+                for index in node.get('indexes', []):
+                    indexes.append({
+                        'collection': node.get('collection'),
+                        'name': index.get('name'),
+                        'type': index.get('type'),
+                        'fields': index.get('fields')
+                    })
+
+        return {
+            'full_scans': full_scans,
+            'indexes': indexes
+        }
+
+    def _record_query(self, name: str, cursor: any, duration: float) -> None:
+        labels = { 'method': name }
+
+        self.metrics.increment('queries_total', labels)
+
+        self.metrics.observe('query_duration_seconds', duration, labels)
+
+        # rows of the first batch, the whole result unless the cursor has more batches to fetch
+        rows = cursor.count() if cursor.count() is not None else len(cursor.batch())
+
+        self.metrics.observe('query_rows', rows, labels, MetricsRegistry.size_buckets)
+
+        statistics = cursor.statistics() or {}
+
+        if 'execution_time' in statistics:
+            self.metrics.observe('query_execution_seconds', statistics['execution_time'], labels)
+
+        scanned = statistics.get('scanned_full', 0) + statistics.get('scanned_index', 0)
+
+        self.metrics.observe('query_scanned_documents', scanned, labels, MetricsRegistry.size_buckets)
+
+        if 'peak_memory_usage' in statistics:
+            self.metrics.observe('query_peak_memory_bytes', statistics['peak_memory_usage'], labels, MetricsRegistry.size_buckets)
+
+    def _log_slow_query(self, name: str, aql: str, bind_vars: dict | None, duration: float) -> None:
+        details = {
+            'method': name,
+            'duration': round(duration, 6),
+            'bind_vars': self._get_shape(bind_vars or {})
+        }
+
+        with DatabaseArangodbDocument._slow_query_lock:
+            explained_at = DatabaseArangodbDocument._slow_query_explained.get(name, 0)
+
+            must_explain = time.monotonic() - explained_at >= self.slow_query_explain_interval
+
+            if must_explain:
+                DatabaseArangodbDocument._slow_query_explained[name] = time.monotonic()
+
+        if must_explain:
+            try:
+                plan = self.explain(aql, bind_vars)
+
+                details.update(self.get_plan_summary(plan))
+
+                details['plan'] = plan
+
+            except DatabaseArangodbQueryException:
+                details['plan'] = None
+
+        if DatabaseArangodbDocument.logger is None:
+            DatabaseArangodbDocument.logger = Logger('storage')
+
+        self.logger.warning(f'Slow query {json.dumps(details, default = str)}')
+
+    def _get_shape(self, value: any) -> any:
+        # describes the bind variables without disclosing their values
+        if isinstance(value, dict):
+            return { key: self._get_shape(item) for key, item in value.items() }
+
+        if isinstance(value, (list, tuple)):
+            return f'list[{len(value)}]'
+
+        return type(value).__name__
+
+    def _get_sample(self, value: any) -> any:
+        # keeps enough of the bind variables to explain the query, not the bulk payloads
+        if isinstance(value, dict):
+            return { key: self._get_sample(item) for key, item in value.items() }
+
+        if isinstance(value, (list, tuple)):
+            return [self._get_sample(item) for item in value[:1]]
+
+        if isinstance(value, str):
+            return value[:self.catalog_string_length]
+
+        return value
+
+    def _get_caller_name(self) -> str:
+        # the first frame outside of the database layer is the storage method, e.g. `TicketItemStorage.get_active`
+        frame = sys._getframe(1)
+
+        while frame.f_back is not None and frame.f_globals.get('__name__', '').startswith(self._layer_modules):
+            frame = frame.f_back
+
+        return f'{self.__class__.__name__}.{frame.f_code.co_name}'
+
+    def _get_sequence_aql(self, variable: str = 'revision', increment: int = 1, fields: str = '') -> str:
+        """
+        AQL fragment updating the `@sequence` counter and assigning its new value to a variable.
+        The counter is locked until the query commits.
+
+        :param variable: name of the AQL variable.
+        :param increment: amount added to the counter.
+        :param fields: other attributes to set, as AQL object members where `previous` is the current document or null.
+        :return: the AQL fragment.
+        """
+
+        if fields:
+            fields = f', {fields}'
+
+        return f"""
+            LET previous = DOCUMENT('{self.sequence_collection_name}', @sequence)
+
+            LET {variable} = FIRST(
+                UPSERT {{ '_key': @sequence }}
+                INSERT {{ '_key': @sequence, 'value': {increment}{fields} }}
+                UPDATE {{ 'value': OLD.value + {increment}{fields} }}
+                IN {self.sequence_collection_name} OPTIONS {{ exclusive: true, keepNull: false }}
+
+                RETURN NEW.value
+            )
+        """
+
+    def _reserve_revision(self, sequence: str) -> int:
+        """
+        Takes the next value of a sequence for a write, which must release it with `_release_revision` once done.
+        The counter is only locked while the value is taken so the writes run concurrently and may commit out of order,
+        the value stays pending meanwhile and `_get_committed_revision_aql` stops right before it.
+
+        :param sequence: the sequence name.
+        :return: the revision.
+        """
+
+        aql = f"""
+            {self._get_sequence_aql(fields = "'pending': { [TO_STRING(previous.value + 1)]: DATE_NOW() }")}
+
+            RETURN revision
+        """
+
+        return self.query(aql, bind_vars = {
+            'sequence': sequence
+        }).next()
+
+    def _release_revision(self, sequence: str, revision: int) -> None:
+        """
+        Marks a value taken by `_reserve_revision` as committed, or abandoned.
+
+        :param sequence: the sequence name.
+        :param revision: the reserved revision.
+        """
+
+        aql = f"""
+            {self._get_sequence_aql('released', increment = 0, fields = "'pending': { [TO_STRING(@revision)]: null }")}
+
+            RETURN released
+        """
+
+        try:
+            self.query(aql, bind_vars = {
+                'sequence': sequence,
+                'revision': revision
+            })
+
+        # the write is done anyway, readers stop waiting for the revision after `revision_timeout`
+        except DatabaseArangodbQueryException:
+            pass
+
+    def _query_with_revision(self, sequence: str, aql: str, bind_vars: dict, **kwargs) -> any:
+        """
+        Runs a write stamping the rows with a revision reserved for its duration, available as the `@revision` bind variable.
+
+        :param sequence: the sequence name.
+        :param aql: the query.
+        :param bind_vars: the other bind variables of the query.
+        :return: the cursor.
+        """
+
+        revision = self._reserve_revision(sequence)
+
+        try:
+            return self.query(aql, bind_vars = { **bind_vars, 'revision': revision }, **kwargs)
+
+        finally:
+            self._release_revision(sequence, revision)
+
+    def _get_committed_revision_aql(self, sequence: str = 'sequence') -> str:
+        """
+        AQL expression of the last revision every write has committed up to, skipping the values pending for longer than `revision_timeout`.
+
+        :param sequence: the AQL variable holding the sequence document.
+        :return: the AQL expression.
+        """
+
+        return f"""
+            NOT_NULL(
+                MIN((
+                    FOR pending IN ATTRIBUTES(NOT_NULL({sequence}.pending, {{}}))
+
+                    FILTER {sequence}.pending[pending] > DATE_NOW() - {self.revision_timeout * 1000}
+
+                    RETURN TO_NUMBER(pending) - 1
+                )),
+                NOT_NULL({sequence}.value, 0)
+            )
+        """
+
 class DatabaseArangodbCollectionNotFoundException(Exception):
 
     pass
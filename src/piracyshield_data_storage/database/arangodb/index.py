@@ -0,0 +1,118 @@
+from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument, DatabaseArangodbQueryException
+
+from arango.exceptions import CollectionCreateError, IndexCreateError
+
+class DatabaseArangodbIndex(DatabaseArangodbDocument):
+
+    """
+    Creates or verifies the indexes declared by the storages.
+    """
+
+    def __init__(self, as_root = False):
+        super().__init__(as_root = as_root)
+
+    def bootstrap(self, storages: list) -> list | Exception:
+        """
+        Ensures every collection and index declared by the storages, can be run multiple times.
+
+        :param storages: a list of storage classes.
+        :return: a list with the collection, fields and creation status of each index.
+        """
+
+        report = []
+
+        self.ensure_collection(self.sequence_collection_name)
+
+        for storage in storages:
+            for index in storage.indexes:
+                collection_name = index.get('collection', self._get_collection_name(storage))
+
+                report.append({
+                    'collection': collection_name,
+                    'fields': index['fields'],
+                    'new': self.ensure(collection_name, index)
+                })
+
+        return report
+
+    def ensure(self, collection_name: str, index: dict) -> bool | Exception:
+        """
+        Creates a persistent index unless an identical one already exists.
+
+        :param collection_name: the collection to index.
+        :param index: dictionary with `fields` and optional `unique` and `sparse` flags.
+        :return: true if the index has been created.
+        """
+
+        self.ensure_collection(collection_name)
+
+        try:
+            response = self.collection(collection_name).add_persistent_index(
+                fields = index['fields'],
+                unique = index.get('unique', False),
+                sparse = index.get('sparse', False),
+                in_background = True
+            )
+
+            return response.get('new', False)
+
+        except IndexCreateError:
+            raise DatabaseArangodbIndexException()
+
+    def ensure_collection(self, collection_name: str) -> bool | Exception:
+        """
+        Creates a collection if missing.
+
+        :param collection_name: the collection name.
+        :return: true if the collection has been created.
+        """
+
+        try:
+            if self.instance.has_collection(collection_name):
+                return False
+
+            self.instance.create_collection(collection_name)
+
+            return True
+
+        except CollectionCreateError:
+            raise DatabaseArangodbIndexException()
+
+    def get_full_scans(self, queries: dict = None) -> list | Exception:
+        """
+        Explains the queries and reports those still scanning a whole collection.
+
+        :param queries: dictionary of name and (aql, bind_vars), defaults to the queries recorded in the catalog.
+        :return: a list with the name of the query and the collections scanned in full.
+        """
+
+        queries = queries if queries is not None else DatabaseArangodbDocument.catalog
+
+        report = []
+
+        for name, (aql, bind_vars) in queries.items():
+            try:
+                summary = self.get_plan_summary(self.explain(aql, bind_vars))
+
+            except DatabaseArangodbQueryException:
+                raise DatabaseArangodbIndexException()
+
+            if summary['full_scans']:
+                report.append({
+                    'name': name,
+                    'full_scans': summary['full_scans']
+                })
+
+        return report
+
+    def _get_collection_name(self, storage: type) -> str:
+        # account storages receive their collection through the `COLLECTION` constant
+        return getattr(storage, 'COLLECTION', None) or storage.collection_name
+
+class DatabaseArangodbIndexException(Exception):
+
+    """
+    Cannot create the index.
+    """
+
+    pass
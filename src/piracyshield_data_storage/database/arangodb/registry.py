@@ -0,0 +1,122 @@
+from arango import ArangoClient
+from arango.http import DefaultHTTPClient
+
+import os
+import threading
+
+class DatabaseArangodbConnectionRegistry:
+
+    """
+    Process-wide registry of ArangoDB database handles.
+
+    Handles are keyed by host, database and credentials so every storage sharing the same settings
+    reuses the same client and its HTTP keep-alive pool.
+    The registry is dropped in forked children as sockets cannot be shared between processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        self._pid = os.getpid()
+
+        self._clients = {}
+
+        self._databases = {}
+
+        self.hits = 0
+
+        self.misses = 0
+
+    def get(self, hosts: str, database: str, username: str, password: str, verify: bool = False, pool_size: int = 10) -> any:
+        """
+        Returns a shared database handle, creating it on first use.
+
+        :param hosts: the full ArangoDB endpoint.
+        :param database: the database name.
+        :param username: the database username.
+        :param password: the database password.
+        :param verify: verify the connection when the handle is created.
+        :param pool_size: number of keep-alive connections kept per host.
+        :return: the database handle.
+        """
+
+        key = (hosts, database, username, password, pool_size)
+
+        with self._lock:
+            self._check_pid()
+
+            if key in self._databases:
+                self.hits += 1
+
+                return self._databases[key]
+
+            self.misses += 1
+
+            client = self._get_client(hosts, pool_size)
+
+        # verifying the handle is a round trip to the server, other lookups must not wait for it
+        handle = client.db(database, username, password, verify)
+
+        with self._lock:
+            self._check_pid()
+
+            # the first handle published by concurrent misses wins
+            return self._databases.setdefault(key, handle)
+
+    def get_stats(self) -> dict:
+        """
+        Reuse statistics of the registry.
+
+        :return: dictionary with hits, misses, hit rate and number of open handles.
+        """
+
+        with self._lock:
+            total = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'clients': len(self._clients),
+                'databases': len(self._databases)
+            }
+
+    def reset(self) -> None:
+        """
+        Closes every client and empties the registry.
+        """
+
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+
+            self._clients = {}
+
+            self._databases = {}
+
+            self.hits = 0
+
+            self.misses = 0
+
+    def _get_client(self, hosts: str, pool_size: int) -> ArangoClient:
+        key = (hosts, pool_size)
+
+        if key not in self._clients:
+            self._clients[key] = ArangoClient(
+                hosts = hosts,
+                http_client = DefaultHTTPClient(
+                    pool_connections = pool_size,
+                    pool_maxsize = pool_size
+                )
+            )
+
+        return self._clients[key]
+
+    def _check_pid(self) -> None:
+        # a forked child must not reuse the sockets of its parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+
+            self._clients = {}
+
+            self._databases = {}
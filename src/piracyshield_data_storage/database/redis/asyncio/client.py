@@ -0,0 +1,77 @@
+from piracyshield_data_storage.database.redis.client import DatabaseRedisInstrumentation
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+
+import time
+
+class DatabaseRedisAsyncClient(DatabaseRedisInstrumentation, Redis):
+
+    """
+    Asyncio counterpart of DatabaseRedisClient.
+    """
+
+    def __init__(self, *args, owner: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.owner = owner
+
+    async def execute_command(self, *args, **options) -> any:
+        if not self.metrics_enabled:
+            return await super().execute_command(*args, **options)
+
+        command = self._get_command_name(args)
+
+        method = self._get_caller_name()
+
+        start = time.perf_counter()
+
+        try:
+            response = await super().execute_command(*args, **options)
+
+        except RedisError:
+            self._record_error(command, method)
+
+            raise
+
+        self._record_command(command, self._get_request_size(args), response, time.perf_counter() - start, method)
+
+        return response
+
+    def pipeline(self, transaction: bool = True, shard_hint: any = None) -> 'DatabaseRedisAsyncPipeline':
+        pipeline = DatabaseRedisAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+        pipeline.owner = self.owner
+
+        return pipeline
+
+class DatabaseRedisAsyncPipeline(DatabaseRedisInstrumentation, Pipeline):
+
+    """
+    Asyncio counterpart of DatabaseRedisPipeline.
+    """
+
+    owner = None
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        if not self.metrics_enabled:
+            return await super().execute(raise_on_error)
+
+        method = self._get_caller_name()
+
+        request_size = sum(self._get_request_size(arguments) for arguments, options in self.command_stack)
+
+        start = time.perf_counter()
+
+        try:
+            response = await super().execute(raise_on_error)
+
+        except RedisError:
+            self._record_error('PIPELINE', method)
+
+            raise
+
+        self._record_command('PIPELINE', request_size, response, time.perf_counter() - start, method)
+
+        return response
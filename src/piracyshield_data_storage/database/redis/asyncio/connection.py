@@ -0,0 +1,59 @@
+from piracyshield_data_storage.database.redis.connection import DatabaseRedisConnection, DatabaseRedisConnectionException
+from piracyshield_data_storage.database.redis.asyncio.registry import DatabaseRedisAsyncConnectionRegistry
+from piracyshield_data_storage.database.redis.asyncio.client import DatabaseRedisAsyncClient
+
+import asyncio
+import weakref
+
+class DatabaseRedisAsyncConnection(DatabaseRedisConnection):
+
+    """
+    Asyncio counterpart of the Redis connection.
+    The clients are created on first use in each event loop, so storages can be built outside of one.
+    """
+
+    # shared by every async storage of this process
+    registry = DatabaseRedisAsyncConnectionRegistry()
+
+    _clients = None
+
+    _raw_clients = None
+
+    def establish(self, database: str) -> None:
+        self._database = database
+
+        self._clients = weakref.WeakKeyDictionary()
+
+    def establish_raw(self, database: str) -> None:
+        self._raw_database = database
+
+        self._raw_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def instance(self) -> DatabaseRedisAsyncClient | None:
+        if self._clients is None:
+            return None
+
+        return self._get_client(self._clients, self._database)
+
+    @property
+    def raw_instance(self) -> DatabaseRedisAsyncClient | None:
+        if self._raw_clients is None:
+            return None
+
+        return self._get_client(self._raw_clients, self._raw_database, decode_responses = False)
+
+    def _get_client(self, clients: weakref.WeakKeyDictionary, database: str, decode_responses: bool = True) -> DatabaseRedisAsyncClient:
+        try:
+            loop = asyncio.get_running_loop()
+
+            if loop not in clients:
+                clients[loop] = DatabaseRedisAsyncClient(
+                    connection_pool = self._get_pool(database, decode_responses = decode_responses),
+                    owner = self.__class__.__name__
+                )
+
+            return clients[loop]
+
+        except:
+            raise DatabaseRedisConnectionException()
@@ -0,0 +1,146 @@
+from piracyshield_data_storage.database.redis.asyncio.connection import DatabaseRedisAsyncConnection
+from piracyshield_data_storage.database.redis.document import DatabaseRedisDocument, DatabaseRedisSetException, DatabaseRedisGetException
+
+from redis.exceptions import RedisError
+
+class DatabaseRedisAsyncDocument(DatabaseRedisAsyncConnection):
+
+    """
+    Asyncio counterpart of DatabaseRedisDocument.
+    """
+
+    scripts = DatabaseRedisDocument.scripts
+
+    metrics = DatabaseRedisDocument.metrics
+
+    key_groups = DatabaseRedisDocument.key_groups
+
+    _registered_scripts = None
+
+    async def keys(self, key: str) -> any:
+        try:
+            return await self.instance.keys(
+                pattern = key
+            )
+
+        except:
+            raise DatabaseRedisGetException()
+
+    # string
+
+    async def set_with_expiry(self, key: str, value: any, expiry: int) -> bool | Exception:
+        if await self.instance.set(key, value, ex = expiry) == True:
+            return True
+
+        raise DatabaseRedisSetException()
+
+    async def setnx_with_expiry(self, key: str, value: any, expiry: int) -> bool | Exception:
+        try:
+            return await self.instance.set(key, value, ex = expiry, nx = True) == True
+
+        except RedisError:
+            raise DatabaseRedisSetException()
+
+    async def incr(self, key: str, amount: int = 1) -> bool | Exception:
+        return await self.instance.incr(name = key, amount = amount)
+
+    async def get(self, key: str) -> any:
+        return await self.instance.get(key)
+
+    async def delete(self, key: str) -> any:
+        return await self.instance.delete(key)
+
+    # hash
+
+    async def hset_with_expiry(self, key: str, mapping: dict, expiry: int) -> bool | Exception:
+        try:
+            return await self.run_script(
+                'hset_with_expiry',
+                keys = [key],
+                args = [expiry, *self._flatten_mapping(mapping)]
+            ) == 1
+
+        except RedisError:
+            raise DatabaseRedisSetException()
+
+    async def hgetall(self, key: str) -> any:
+        try:
+            return await self.instance.hgetall(
+                name = key
+            )
+
+        except:
+            raise DatabaseRedisGetException()
+
+    # list
+
+    async def lpush_with_expiry(self, key: str, value: str, expiry: int, size: int = 0) -> bool | Exception:
+        try:
+            return await self.run_script(
+                'lpush_with_expiry',
+                keys = [key],
+                args = [value, expiry, size]
+            ) > 0
+
+        except RedisError:
+            raise DatabaseRedisSetException()
+
+    # scripts
+
+    async def run_script(self, name: str, keys: list = None, args: list = None) -> any:
+        return await self._get_script(name)(keys = keys or [], args = args or [])
+
+    async def load_scripts(self) -> None:
+        for name in self.scripts:
+            await self.instance.script_load(self.scripts[name])
+
+    _get_script = DatabaseRedisDocument._get_script
+
+    _flatten_mapping = DatabaseRedisDocument._flatten_mapping
+
+    # memory
+
+    async def sample_memory_usage(self, limit: int = 10000, count: int = 1000) -> dict | Exception:
+        groups = {}
+
+        sampled = 0
+
+        try:
+            total = await self.instance.dbsize()
+
+            cursor = 0
+
+            while sampled < limit:
+                cursor, keys = await self.instance.scan(cursor = cursor, count = count)
+
+                keys = keys[:limit - sampled]
+
+                pipeline = self.instance.pipeline(transaction = False)
+
+                for key in keys:
+                    pipeline.memory_usage(key)
+
+                for key, usage in zip(keys, await pipeline.execute()):
+                    self._add_memory_usage(groups, key, usage)
+
+                sampled += len(keys)
+
+                if cursor == 0:
+                    break
+
+        except RedisError:
+            raise DatabaseRedisGetException()
+
+        return self._get_memory_usage(groups, sampled, total)
+
+    _add_memory_usage = DatabaseRedisDocument._add_memory_usage
+
+    _get_memory_usage = DatabaseRedisDocument._get_memory_usage
+
+    _get_key_group = DatabaseRedisDocument._get_key_group
+
+    # keys
+
+    _get_digest = DatabaseRedisDocument._get_digest
+
+    _is_digest = DatabaseRedisDocument._is_digest
@@ -0,0 +1,75 @@
+from piracyshield_data_storage.database.redis.registry import DatabaseRedisConnectionRegistry
+
+from redis.asyncio import BlockingConnectionPool
+
+import asyncio
+import weakref
+
+class DatabaseRedisAsyncConnectionPool(BlockingConnectionPool):
+
+    """
+    Asyncio counterpart of DatabaseRedisConnectionPool.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.in_use = 0
+
+        self.waits = 0
+
+        self.created = 0
+
+    async def get_connection(self, *args, **kwargs) -> any:
+        # every connection is taken, the caller waits until one is released
+        if self.in_use >= self.max_connections:
+            self.waits += 1
+
+        connection = await super().get_connection(*args, **kwargs)
+
+        self.in_use += 1
+
+        return connection
+
+    async def release(self, connection: any) -> None:
+        self.in_use = max(self.in_use - 1, 0)
+
+        await super().release(connection)
+
+    def make_connection(self) -> any:
+        self.created += 1
+
+        return super().make_connection()
+
+class DatabaseRedisAsyncConnectionRegistry(DatabaseRedisConnectionRegistry):
+
+    """
+    Asyncio counterpart of DatabaseRedisConnectionRegistry, pools are also kept per event loop
+    and must be requested from a running loop.
+    """
+
+    pool_class = DatabaseRedisAsyncConnectionPool
+
+    def _create_pools(self) -> weakref.WeakKeyDictionary:
+        # the pools of a loop are dropped with it
+        return weakref.WeakKeyDictionary()
+
+    def _get_pools(self) -> dict:
+        # asyncio connections are bound to the loop that opened them
+        return self._pools.setdefault(asyncio.get_running_loop(), {})
+
+    def _get_all_pools(self) -> list:
+        return [pool for pools in list(self._pools.values()) for pool in pools.values()]
+
+    async def reset(self) -> None:
+        """
+        Disconnects every pool and empties the registry.
+        """
+
+        with self._lock:
+            pools = self._get_all_pools()
+
+            self._pools = self._create_pools()
+
+        for pool in pools:
+            await pool.disconnect()
@@ -0,0 +1,144 @@
+from piracyshield_data_storage.metrics.registry import MetricsRegistry
+
+from redis import Redis
+from redis.client import Pipeline
+from redis.exceptions import RedisError
+
+import sys
+import time
+
+class DatabaseRedisInstrumentation:
+
+    """
+    Records the latency, payload size and errors of the commands, tagged by the calling storage method.
+    """
+
+    # shared by every Redis storage of this process
+    metrics = MetricsRegistry('redis')
+
+    # off by default, the authentication path issues many small commands
+    metrics_enabled = False
+
+    # frames skipped when looking for the storage method that issued a command
+    _layer_modules = ('piracyshield_data_storage.database.', 'redis.')
+
+    def _record_command(self, command: str, request_size: int, response: any, duration: float, method: str) -> None:
+        labels = { 'method': method, 'command': command }
+
+        self.metrics.increment('commands_total', labels)
+
+        self.metrics.observe('command_duration_seconds', duration, labels)
+
+        self.metrics.observe('command_request_bytes', request_size, labels, MetricsRegistry.size_buckets)
+
+        # collections are not walked, large replies would make every command pay for it
+        if isinstance(response, (list, tuple, set, dict)):
+            self.metrics.observe('command_response_items', len(response), labels, MetricsRegistry.size_buckets)
+
+        else:
+            self.metrics.observe('command_response_bytes', self._get_response_size(response), labels, MetricsRegistry.size_buckets)
+
+    def _record_error(self, command: str, method: str) -> None:
+        self.metrics.increment('command_errors_total', { 'method': method, 'command': command })
+
+    def _get_caller_name(self) -> str:
+        # the first frame outside of the database layer and redis-py, e.g. `AccountSessionMemory.find_long_session`
+        frame = sys._getframe(1)
+
+        while frame.f_back is not None and frame.f_globals.get('__name__', '').startswith(self._layer_modules):
+            frame = frame.f_back
+
+        caller = frame.f_locals.get('self')
+
+        return f'{type(caller).__name__ if caller is not None else self.owner}.{frame.f_code.co_name}'
+
+    def _get_request_size(self, args: tuple) -> int:
+        # approximate number of bytes sent, the arguments are encoded anyway
+        return sum(len(arg) if isinstance(arg, (bytes, str)) else len(str(arg)) for arg in args)
+
+    def _get_response_size(self, value: any) -> int:
+        # approximate number of bytes of a scalar reply
+        if isinstance(value, (bytes, str)):
+            return len(value)
+
+        if value is None:
+            return 0
+
+        return len(str(value))
+
+    def _get_command_name(self, args: tuple) -> str:
+        return str(args[0]).upper() if args else 'UNKNOWN'
+
+class DatabaseRedisClient(DatabaseRedisInstrumentation, Redis):
+
+    """
+    Redis client recording its commands and pipelines.
+    """
+
+    def __init__(self, *args, owner: str = None, **kwargs):
+        """
+        :param owner: class name of the storage, used when a command is not issued from a method.
+        """
+
+        super().__init__(*args, **kwargs)
+
+        self.owner = owner
+
+    def execute_command(self, *args, **options) -> any:
+        if not self.metrics_enabled:
+            return super().execute_command(*args, **options)
+
+        command = self._get_command_name(args)
+
+        method = self._get_caller_name()
+
+        start = time.perf_counter()
+
+        try:
+            response = super().execute_command(*args, **options)
+
+        except RedisError:
+            self._record_error(command, method)
+
+            raise
+
+        self._record_command(command, self._get_request_size(args), response, time.perf_counter() - start, method)
+
+        return response
+
+    def pipeline(self, transaction: bool = True, shard_hint: any = None) -> 'DatabaseRedisPipeline':
+        pipeline = DatabaseRedisPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+        pipeline.owner = self.owner
+
+        return pipeline
+
+class DatabaseRedisPipeline(DatabaseRedisInstrumentation, Pipeline):
+
+    """
+    Pipeline recorded as a single `PIPELINE` command when executed.
+    """
+
+    owner = None
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        if not self.metrics_enabled:
+            return super().execute(raise_on_error)
+
+        method = self._get_caller_name()
+
+        request_size = sum(self._get_request_size(arguments) for arguments, options in self.command_stack)
+
+        start = time.perf_counter()
+
+        try:
+            response = super().execute(raise_on_error)
+
+        except RedisError:
+            self._record_error('PIPELINE', method)
+
+            raise
+
+        self._record_command('PIPELINE', request_size, response, time.perf_counter() - start, method)
+
+        return response
@@ -1,30 +1,75 @@
 from piracyshield_component.config import Config
 
-from redis import Redis
+from piracyshield_data_storage.database.redis.registry import DatabaseRedisConnectionRegistry
+from piracyshield_data_storage.database.redis.client import DatabaseRedisClient
 
 class DatabaseRedisConnection:
 
     instance = None
 
+    # returns bytes instead of strings, for binary values
+    raw_instance = None
+
     database_config = None
 
+    # shared by every storage of this process
+    registry = DatabaseRedisConnectionRegistry()
+
+    default_max_connections = 50
+
+    # seconds a caller waits for a free connection before failing
+    default_pool_timeout = 5
+
+    default_health_check_interval = 30
+
     def __init__(self) -> None:
         self._prepare_configs()
 
+        # key tokens by a fixed-length digest instead of embedding them
+        self.compact_keys = self.database_config.get('compact_keys', False)
+
+        # also look up the keys written before compact keys were enabled
+        self.legacy_keys_fallback = self.database_config.get('legacy_keys_fallback', True)
+
     def establish(self, database: str) -> None:
         try:
-            self.instance = Redis(
-                host = self.database_config['host'],
-                port = self.database_config['port'],
-                db = database,
-                decode_responses = True
+            self.instance = DatabaseRedisClient(
+                connection_pool = self._get_pool(database),
+                owner = self.__class__.__name__
             )
 
         except:
             raise DatabaseRedisConnectionException()
 
+    def establish_raw(self, database: str) -> None:
+        try:
+            self.raw_instance = DatabaseRedisClient(
+                connection_pool = self._get_pool(database, decode_responses = False),
+                owner = self.__class__.__name__
+            )
+
+        except:
+            raise DatabaseRedisConnectionException()
+
+    def _get_pool(self, database: str, decode_responses: bool = True) -> any:
+        return self.registry.get(
+            host = self.database_config['host'],
+            port = self.database_config['port'],
+            db = database,
+            decode_responses = decode_responses,
+            max_connections = self.database_config.get('max_connections', self.default_max_connections),
+            timeout = self.database_config.get('pool_timeout', self.default_pool_timeout),
+            health_check_interval = self.database_config.get('health_check_interval', self.default_health_check_interval),
+            socket_timeout = self.database_config.get('socket_timeout'),
+            socket_connect_timeout = self.database_config.get('socket_connect_timeout')
+        )
+
     def _prepare_configs(self) -> None:
-        self.database_config = Config('database/redis').get('connection')
+        # the configuration is read once per process
+        if DatabaseRedisConnection.database_config is None:
+            DatabaseRedisConnection.database_config = Config('database/redis').get('connection')
+
+        self.database_config = DatabaseRedisConnection.database_config
 
 class DatabaseRedisConnectionException(Exception):
 
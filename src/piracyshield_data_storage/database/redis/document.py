@@ -1,11 +1,55 @@
 from piracyshield_data_storage.database.redis.connection import DatabaseRedisConnection
+from piracyshield_data_storage.database.redis.client import DatabaseRedisClient
+
+from redis.exceptions import RedisError
+
+import hashlib
 
 class DatabaseRedisDocument(DatabaseRedisConnection):
 
+    # server-side scripts by name, storages extend them with their own
+    scripts = {
+        # KEYS[1]: hash, ARGV[1]: expiry, ARGV[2..]: fields and values
+        'hset_with_expiry': """
+            redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+            redis.call('EXPIRE', KEYS[1], ARGV[1])
+
+            return 1
+        """,
+
+        # KEYS[1]: list, ARGV[1]: value, ARGV[2]: expiry, ARGV[3]: maximum size, 0 for none
+        'lpush_with_expiry': """
+            local size = redis.call('LPUSH', KEYS[1], ARGV[1])
+
+            if tonumber(ARGV[3]) > 0 then
+                redis.call('LTRIM', KEYS[1], 0, tonumber(ARGV[3]) - 1)
+            end
+
+            redis.call('EXPIRE', KEYS[1], ARGV[2])
+
+            return size
+        """
+    }
+
+    _registered_scripts = None
+
+    # commands and pipelines are recorded by the client, see DatabaseRedisInstrumentation
+    metrics = DatabaseRedisClient.metrics
+
+    # key prefixes of the storages, used to attribute the memory usage to a feature
+    key_groups = {
+        'session': 'session:',
+        'session_index': 'session_index:',
+        'session_token': 'session_token:',
+        'token': 'token:',
+        'ip_address': 'ip_address:',
+        'api_requests': 'api_requests:'
+    }
+
     def keys(self, key: str) -> any:
         try:
             return self.instance.keys(
-                name = key
+                pattern = key
             )
 
         except:
@@ -20,24 +64,17 @@ class DatabaseRedisDocument(DatabaseRedisConnection):
         raise DatabaseRedisSetException()
 
     def setnx_with_expiry(self, key: str, value: any, expiry: int) -> bool | Exception:
-        pipeline = self.instance.pipeline()
-
-        pipeline.setnx(
-            name = key,
-            value = value
-        )
+        """
+        Sets a value with an expiry only if the key does not exist.
 
-        pipeline.expire(
-            name = key,
-            time = expiry
-        )
+        :return: true if the value has been set, false if the key already existed.
+        """
 
-        result = pipeline.execute()
-
-        if result:
-            return True
+        try:
+            return self.instance.set(key, value, ex = expiry, nx = True) == True
 
-        raise DatabaseRedisSetException()
+        except RedisError:
+            raise DatabaseRedisSetException()
 
     def incr(self, key: str, amount: int = 1) -> bool | Exception:
         return self.instance.incr(name = key, amount = amount)
@@ -50,25 +87,16 @@ class DatabaseRedisDocument(DatabaseRedisConnection):
 
     # hash
 
-    def hset_with_expiry(self, key: str, mapping: list, expiry: int) -> bool | Exception:
-        pipeline = self.instance.pipeline()
-
-        pipeline.hset(
-            name = key,
-            mapping = mapping
-        )
-
-        pipeline.expire(
-            name = key,
-            time = expiry
-        )
-
-        result = pipeline.execute()
-
-        if result:
-            return True
+    def hset_with_expiry(self, key: str, mapping: dict, expiry: int) -> bool | Exception:
+        try:
+            return self.run_script(
+                'hset_with_expiry',
+                keys = [key],
+                args = [expiry, *self._flatten_mapping(mapping)]
+            ) == 1
 
-        raise DatabaseRedisSetException()
+        except RedisError:
+            raise DatabaseRedisSetException()
 
     def hgetall(self, key: str) -> any:
         try:
@@ -81,25 +109,142 @@ class DatabaseRedisDocument(DatabaseRedisConnection):
 
     # list
 
-    def lpush_with_expiry(self, key: str, value: str, expiry: int) -> bool | Exception:
-        pipeline = self.instance.pipeline()
+    def lpush_with_expiry(self, key: str, value: str, expiry: int, size: int = 0) -> bool | Exception:
+        """
+        Pushes a value to the head of a list and refreshes its expiry.
+
+        :param size: keep only the newest items, 0 keeps them all.
+        """
 
-        pipeline.lpush(
-            key,
-            value
-        )
+        try:
+            return self.run_script(
+                'lpush_with_expiry',
+                keys = [key],
+                args = [value, expiry, size]
+            ) > 0
 
-        pipeline.expire(
-            name = key,
-            time = expiry
-        )
+        except RedisError:
+            raise DatabaseRedisSetException()
 
-        result = pipeline.execute()
+    # scripts
 
-        if result:
-            return True
+    def run_script(self, name: str, keys: list = None, args: list = None) -> any:
+        """
+        Runs a script of the registry with EVALSHA, loading it again if the server does not know it.
 
-        raise DatabaseRedisSetException()
+        :param name: the script name in `scripts`.
+        :param keys: the keys accessed by the script.
+        :param args: the arguments of the script.
+        :return: the script result.
+        """
+
+        return self._get_script(name)(keys = keys or [], args = args or [])
+
+    def load_scripts(self) -> None:
+        """
+        Loads every script of the registry on the server, to be called once at startup.
+        """
+
+        for name in self.scripts:
+            self.instance.script_load(self.scripts[name])
+
+    def _get_script(self, name: str) -> any:
+        # Script objects are bound to the client they were registered with
+        if self._registered_scripts is None or self._registered_scripts['client'] is not self.instance:
+            self._registered_scripts = { 'client': self.instance }
+
+        if name not in self._registered_scripts:
+            self._registered_scripts[name] = self.instance.register_script(self.scripts[name])
+
+        return self._registered_scripts[name]
+
+    def _flatten_mapping(self, mapping: dict) -> list:
+        return [item for field, value in mapping.items() for item in (field, value)]
+
+    # memory
+
+    def sample_memory_usage(self, limit: int = 10000, count: int = 1000) -> dict | Exception:
+        """
+        Estimates the memory used by each group of keys from a sample, see `key_groups`.
+
+        :param limit: maximum number of sampled keys.
+        :param count: keys examined per SCAN iteration.
+        :return: dictionary of groups with the number of sampled keys, their bytes and the estimate for the whole database.
+        """
+
+        groups = {}
+
+        sampled = 0
+
+        try:
+            total = self.instance.dbsize()
+
+            cursor = 0
+
+            while sampled < limit:
+                cursor, keys = self.instance.scan(cursor = cursor, count = count)
+
+                keys = keys[:limit - sampled]
+
+                pipeline = self.instance.pipeline(transaction = False)
+
+                for key in keys:
+                    pipeline.memory_usage(key)
+
+                for key, usage in zip(keys, pipeline.execute()):
+                    self._add_memory_usage(groups, key, usage)
+
+                sampled += len(keys)
+
+                if cursor == 0:
+                    break
+
+        except RedisError:
+            raise DatabaseRedisGetException()
+
+        return self._get_memory_usage(groups, sampled, total)
+
+    def _add_memory_usage(self, groups: dict, key: str, usage: int | None) -> None:
+        group = groups.setdefault(self._get_key_group(key), { 'keys': 0, 'bytes': 0 })
+
+        group['keys'] += 1
+
+        # None when the key expired after the scan
+        group['bytes'] += usage or 0
+
+    def _get_memory_usage(self, groups: dict, sampled: int, total: int) -> dict:
+        for group in groups.values():
+            group['estimated_bytes'] = int(group['bytes'] * total / sampled) if sampled else 0
+
+        return groups
+
+    def _get_key_group(self, key: str) -> str:
+        # the longest prefix wins, `session_index:` over `session:`
+        for group, prefix in sorted(self.key_groups.items(), key = lambda item: len(item[1]), reverse = True):
+            if key.startswith(prefix):
+                return group
+
+        # login attempts are stored under the bare e-mail address
+        if '@' in key:
+            return 'login_attempts'
+
+        return 'other'
+
+    # keys
+
+    def _get_digest(self, value: str) -> str:
+        """
+        Fixed-length digest used in place of long values such as tokens in key names.
+
+        :param value: the value to digest.
+        :return: 32 hexadecimal characters.
+        """
+
+        return hashlib.blake2b(value.encode(), digest_size = 16).hexdigest()
+
+    def _is_digest(self, value: str) -> bool:
+        # tokens are JWTs, never 32 hexadecimal characters
+        return len(value) == 32 and all(character in '0123456789abcdef' for character in value)
 
 class DatabaseRedisSetException(Exception):
 
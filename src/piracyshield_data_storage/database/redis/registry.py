@@ -0,0 +1,160 @@
+from redis import BlockingConnectionPool
+
+import os
+import threading
+
+class DatabaseRedisConnectionPool(BlockingConnectionPool):
+
+    """
+    Blocking pool that counts the connections it creates and the callers that had to wait for one.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self._counters_lock = threading.Lock()
+
+        self.in_use = 0
+
+        self.waits = 0
+
+        self.created = 0
+
+    def get_connection(self, *args, **kwargs) -> any:
+        with self._counters_lock:
+            # every connection is taken, the caller blocks until one is released
+            if self.in_use >= self.max_connections:
+                self.waits += 1
+
+        connection = super().get_connection(*args, **kwargs)
+
+        with self._counters_lock:
+            self.in_use += 1
+
+        return connection
+
+    def release(self, connection: any) -> None:
+        with self._counters_lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+        super().release(connection)
+
+    def make_connection(self) -> any:
+        with self._counters_lock:
+            self.created += 1
+
+        return super().make_connection()
+
+    def reset(self) -> None:
+        # called by redis-py when the pool is used from a forked child
+        super().reset()
+
+        self._counters_lock = threading.Lock()
+
+        self.in_use = 0
+
+class DatabaseRedisConnectionRegistry:
+
+    """
+    Process-wide registry of Redis connection pools.
+
+    Pools are keyed by host, port and database index so every storage pointing to the same database
+    shares its sockets instead of opening a pool per instance.
+    The registry is dropped in forked children as sockets cannot be shared between processes.
+    """
+
+    pool_class = DatabaseRedisConnectionPool
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        self._pid = os.getpid()
+
+        self._pools = self._create_pools()
+
+    def get(self, host: str, port: int, db: int, decode_responses: bool = True, **options) -> DatabaseRedisConnectionPool:
+        """
+        Returns a shared connection pool, creating it on first use.
+
+        :param host: the Redis host.
+        :param port: the Redis port.
+        :param db: the database index.
+        :param decode_responses: decode the replies to strings.
+        :param options: pool settings (max_connections, timeout, health_check_interval, socket timeouts), used on creation only.
+        :return: the connection pool.
+        """
+
+        key = self._get_key(host, port, db, decode_responses)
+
+        with self._lock:
+            self._check_pid()
+
+            pools = self._get_pools()
+
+            if key not in pools:
+                pools[key] = self.pool_class(
+                    host = host,
+                    port = port,
+                    db = db,
+                    decode_responses = decode_responses,
+                    **{ name: value for name, value in options.items() if value is not None }
+                )
+
+            return pools[key]
+
+    def get_stats(self) -> dict:
+        """
+        Usage statistics of every pool.
+
+        :return: dictionary with the totals and the per pool counters.
+        """
+
+        with self._lock:
+            pools = [
+                {
+                    'host': pool.connection_kwargs.get('host'),
+                    'port': pool.connection_kwargs.get('port'),
+                    'db': pool.connection_kwargs.get('db'),
+                    'max_connections': pool.max_connections,
+                    'in_use': pool.in_use,
+                    'waits': pool.waits,
+                    'created': pool.created
+                } for pool in self._get_all_pools()
+            ]
+
+        return {
+            'pools': pools,
+            'waits': sum(pool['waits'] for pool in pools),
+            'created': sum(pool['created'] for pool in pools)
+        }
+
+    def reset(self) -> None:
+        """
+        Disconnects every pool and empties the registry.
+        """
+
+        with self._lock:
+            for pool in self._get_all_pools():
+                pool.disconnect()
+
+            self._pools = self._create_pools()
+
+    def _create_pools(self) -> dict:
+        return {}
+
+    def _get_pools(self) -> dict:
+        # pools available to the caller, by key
+        return self._pools
+
+    def _get_all_pools(self) -> list:
+        return list(self._pools.values())
+
+    def _get_key(self, host: str, port: int, db: int, decode_responses: bool) -> tuple:
+        return (host, port, db, decode_responses)
+
+    def _check_pid(self) -> None:
+        # a forked child must not reuse the sockets of its parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+
+            self._pools = self._create_pools()
@@ -6,6 +6,12 @@ class DDAStorage(DatabaseArangodbDocument):
 
     collection_name = 'dda_instances'
 
+    indexes = [
+        { 'fields': ['dda_id'] },
+        { 'fields': ['account_id'] },
+        { 'fields': ['instance'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
@@ -6,6 +6,11 @@ class ForensicStorage(DatabaseArangodbDocument):
 
     collection_name = 'forensics'
 
+    indexes = [
+        { 'fields': ['ticket_id'] },
+        { 'fields': ['hash_string'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
@@ -0,0 +1,49 @@
+from piracyshield_data_storage.database.arangodb.index import DatabaseArangodbIndex
+
+from piracyshield_data_storage.dda.storage import DDAStorage
+from piracyshield_data_storage.forensic.storage import ForensicStorage
+from piracyshield_data_storage.guest.storage import GuestStorage
+from piracyshield_data_storage.internal.storage import InternalStorage
+from piracyshield_data_storage.log.storage import LogStorage
+from piracyshield_data_storage.log.ticket.storage import LogTicketStorage
+from piracyshield_data_storage.log.ticket.item.storage import LogTicketItemStorage
+from piracyshield_data_storage.provider.storage import ProviderStorage
+from piracyshield_data_storage.reporter.storage import ReporterStorage
+from piracyshield_data_storage.ticket.storage import TicketStorage
+from piracyshield_data_storage.ticket.error.storage import TicketErrorStorage
+from piracyshield_data_storage.ticket.item.storage import TicketItemStorage
+from piracyshield_data_storage.whitelist.storage import WhitelistStorage
+
+class IndexBootstrap(DatabaseArangodbIndex):
+
+    """
+    Entry point ensuring the indexes of every storage of the package.
+    """
+
+    storages = [
+        DDAStorage,
+        ForensicStorage,
+        GuestStorage,
+        InternalStorage,
+        LogStorage,
+        LogTicketStorage,
+        LogTicketItemStorage,
+        ProviderStorage,
+        ReporterStorage,
+        TicketStorage,
+        TicketErrorStorage,
+        TicketItemStorage,
+        WhitelistStorage
+    ]
+
+    def __init__(self):
+        super().__init__(as_root = True)
+
+    def run(self) -> list | Exception:
+        """
+        Creates or verifies the indexes of all the storages.
+
+        :return: a list with the collection, fields and creation status of each index.
+        """
+
+        return self.bootstrap(self.storages)
@@ -6,6 +6,10 @@ class LogStorage(DatabaseArangodbDocument):
 
     collection_name = 'logs'
 
+    indexes = [
+        { 'fields': ['identifier'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
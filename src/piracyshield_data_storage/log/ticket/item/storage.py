@@ -6,6 +6,10 @@ class LogTicketItemStorage(DatabaseArangodbDocument):
 
     collection_name = 'log_ticket_blocking_items'
 
+    indexes = [
+        { 'fields': ['ticket_item_id'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
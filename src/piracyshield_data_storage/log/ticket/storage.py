@@ -6,6 +6,10 @@ class LogTicketStorage(DatabaseArangodbDocument):
 
     collection_name = 'log_ticket_blockings'
 
+    indexes = [
+        { 'fields': ['ticket_id'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
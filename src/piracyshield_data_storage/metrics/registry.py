@@ -0,0 +1,166 @@
+import threading
+
+class MetricsRegistry:
+
+    """
+    Thread-safe counters and histograms, exportable in the Prometheus text format.
+    """
+
+    # seconds
+    latency_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    # rows, documents or bytes
+    size_buckets = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+    def __init__(self, namespace: str):
+        """
+        :param namespace: prefix of every exported metric.
+        """
+
+        self.namespace = namespace
+
+        self._lock = threading.Lock()
+
+        self._counters = {}
+
+        self._histograms = {}
+
+        self._buckets = {}
+
+    def increment(self, name: str, labels: dict = None, amount: int = 1) -> None:
+        """
+        Increments a counter.
+
+        :param name: name of the counter.
+        :param labels: optional labels of the sample.
+        :param amount: increment by a number, default: 1.
+        """
+
+        key = (name, self._get_labels_key(labels))
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: dict = None, buckets: tuple = latency_buckets) -> None:
+        """
+        Records a value into a histogram.
+
+        :param name: name of the histogram.
+        :param value: the observed value.
+        :param labels: optional labels of the sample.
+        :param buckets: upper bounds of the histogram, fixed by the first observation.
+        """
+
+        key = (name, self._get_labels_key(labels))
+
+        with self._lock:
+            buckets = self._buckets.setdefault(name, buckets)
+
+            histogram = self._histograms.get(key)
+
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': [0] * len(buckets),
+                    'sum': 0,
+                    'count': 0
+                }
+
+            for position, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['buckets'][position] += 1
+
+                    break
+
+            histogram['sum'] += value
+
+            histogram['count'] += 1
+
+    def dump(self) -> dict:
+        """
+        Returns a copy of every metric.
+
+        :return: dictionary with the list of `counters` and `histograms`.
+        """
+
+        with self._lock:
+            return {
+                'counters': [
+                    {
+                        'name': name,
+                        'labels': dict(labels),
+                        'value': value
+                    } for (name, labels), value in self._counters.items()
+                ],
+                'histograms': [
+                    {
+                        'name': name,
+                        'labels': dict(labels),
+                        'buckets': dict(zip(self._buckets[name], histogram['buckets'])),
+                        'sum': histogram['sum'],
+                        'count': histogram['count']
+                    } for (name, labels), histogram in self._histograms.items()
+                ]
+            }
+
+    def export(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+
+        :return: the exposition text.
+        """
+
+        lines = []
+
+        with self._lock:
+            for name in sorted({ name for name, labels in self._counters }):
+                lines.append(f'# TYPE {self.namespace}_{name} counter')
+
+                for (counter_name, labels), value in self._counters.items():
+                    if counter_name == name:
+                        lines.append(f'{self.namespace}_{name}{self._format_labels(labels)} {value}')
+
+            for name in sorted({ name for name, labels in self._histograms }):
+                lines.append(f'# TYPE {self.namespace}_{name} histogram')
+
+                for (histogram_name, labels), histogram in self._histograms.items():
+                    if histogram_name != name:
+                        continue
+
+                    cumulative = 0
+
+                    for bound, count in zip(self._buckets[name], histogram['buckets']):
+                        cumulative += count
+
+                        lines.append(f'{self.namespace}_{name}_bucket{self._format_labels(labels + (("le", str(bound)),))} {cumulative}')
+
+                    lines.append(f'{self.namespace}_{name}_bucket{self._format_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+
+                    lines.append(f'{self.namespace}_{name}_sum{self._format_labels(labels)} {histogram["sum"]}')
+
+                    lines.append(f'{self.namespace}_{name}_count{self._format_labels(labels)} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """
+        Drops every recorded metric.
+        """
+
+        with self._lock:
+            self._counters = {}
+
+            self._histograms = {}
+
+            self._buckets = {}
+
+    def _get_labels_key(self, labels: dict | None) -> tuple:
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def _format_labels(self, labels: tuple) -> str:
+        if not labels:
+            return ''
+
+        return '{' + ','.join(f'{name}="{self._escape(value)}"' for name, value in labels) + '}'
+
+    def _escape(self, value: any) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
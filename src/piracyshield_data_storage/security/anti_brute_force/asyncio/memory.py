@@ -0,0 +1,167 @@
+from piracyshield_data_storage.database.redis.asyncio.document import DatabaseRedisAsyncDocument
+from piracyshield_data_storage.database.redis.document import DatabaseRedisSetException, DatabaseRedisGetException
+from piracyshield_data_storage.security.anti_brute_force.memory import SecurityAntiBruteForceMemory, SecurityAntiBruteForceMemorySetException, SecurityAntiBruteForceMemoryGetException
+
+from redis.exceptions import RedisError
+
+class SecurityAntiBruteForceAsyncMemory(DatabaseRedisAsyncDocument):
+
+    """
+    Asyncio counterpart of SecurityAntiBruteForceMemory.
+    """
+
+    api_requests_prefix = SecurityAntiBruteForceMemory.api_requests_prefix
+
+    sliding_suffix = SecurityAntiBruteForceMemory.sliding_suffix
+
+    scripts = SecurityAntiBruteForceMemory.scripts
+
+    def __init__(self, database: int):
+        super().__init__()
+
+        self.establish(database)
+
+    async def hit_login_attempts(self, email: str, limit: int, timeframe: int, ip_address: str = None) -> dict | Exception:
+        """
+        Atomically counts a login attempt in a fixed window.
+
+        :param email: a valid e-mail address.
+        :param limit: attempts allowed in the timeframe.
+        :param timeframe: a timeframe in seconds, starting from the first attempt.
+        :param ip_address: optionally count the attempts per e-mail address and IP address.
+        :return: dictionary with attempts, remaining, ttl and allowed.
+        """
+
+        return await self.hit(
+            key = self._get_login_attempts_key(email, ip_address),
+            limit = limit,
+            timeframe = timeframe
+        )
+
+    async def hit_api_requests(self, account_id: str, limit: int, timeframe: int, sliding: bool = True) -> dict | Exception:
+        """
+        Atomically counts an API request of an account.
+
+        :param account_id: a valid account identifier.
+        :param limit: requests allowed in the timeframe.
+        :param timeframe: a timeframe in seconds.
+        :param sliding: use a sliding window instead of a fixed one.
+        :return: dictionary with attempts, remaining, ttl and allowed.
+        """
+
+        return await self.hit(
+            key = f'{self.api_requests_prefix}:{account_id}',
+            limit = limit,
+            timeframe = timeframe,
+            sliding = sliding
+        )
+
+    async def hit(self, key: str, limit: int, timeframe: int, sliding: bool = False, amount: int = 1) -> dict | Exception:
+        """
+        Increments a rate limit counter, sets its expiry on the first hit and returns the outcome, in one round trip.
+
+        :param key: the counter key.
+        :param limit: hits allowed in the timeframe.
+        :param timeframe: a timeframe in seconds.
+        :param sliding: use a sliding window, rejected hits are then not counted.
+        :param amount: increment by a number, default: 1.
+        :return: dictionary with attempts, remaining, ttl and allowed.
+        """
+
+        try:
+            if sliding:
+                attempts, ttl = await self.run_script(
+                    'sliding_window',
+                    keys = [f'{key}:{self.sliding_suffix}'],
+                    args = [amount, timeframe, limit]
+                )
+
+            else:
+                attempts, ttl = await self.run_script(
+                    'fixed_window',
+                    keys = [key],
+                    args = [amount, timeframe]
+                )
+
+        except RedisError:
+            raise SecurityAntiBruteForceMemorySetException()
+
+        return self._get_rate_limit(attempts, ttl, limit)
+
+    async def set_login_attempts(self, email: str, timeframe: int, attempts: int = 1) -> bool | Exception:
+        """
+        Sets the current login attempts in a given timeframe.
+
+        :param email: a valid e-mail address.
+        :param timeframe: a timeframe in seconds.
+        :param attempts: sets number of attempts, default: 1.
+        :return: true if the value has been stored.
+        """
+
+        try:
+            return await self.set_with_expiry(
+                key = self._get_login_attempts_key(email),
+                value = attempts, # store the correct types
+                expiry = timeframe
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityAntiBruteForceMemorySetException()
+
+    async def increment_login_attempts(self, email: str, amount: int = 1) -> bool | Exception:
+        """
+        Increments the attempts by preserving expiry time.
+
+        :param email: a valid e-mail address.
+        :param amount: increment by a number, default: 1.
+        :return: true if successfully executed.
+        """
+
+        try:
+            return await self.incr(
+                key = self._get_login_attempts_key(email),
+                amount = amount
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityAntiBruteForceMemorySetException()
+
+    async def get_login_attempts(self, email: str) -> int | Exception:
+        """
+        Gets the current account login attempts.
+
+        :param email: a valid e-mail address.
+        :return: the number of attempts.
+        """
+
+        try:
+            response = await self.get(key = self._get_login_attempts_key(email))
+
+            if response:
+                # make sure we're dealing with a true int and not a string
+                return int(response)
+
+            return response
+
+        except DatabaseRedisGetException:
+            raise SecurityAntiBruteForceMemoryGetException()
+
+    async def reset_login_attempts(self, email: str) -> bool | Exception:
+        """
+        Unsets the login attempts count.
+
+        :param email: a valid e-mail address.
+        :return: true if successfully executed.
+        """
+
+        try:
+            return await self.delete(
+                key = self._get_login_attempts_key(email)
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityAntiBruteForceMemorySetException()
+
+    _get_login_attempts_key = SecurityAntiBruteForceMemory._get_login_attempts_key
+
+    _get_rate_limit = SecurityAntiBruteForceMemory._get_rate_limit
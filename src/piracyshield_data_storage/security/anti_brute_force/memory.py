@@ -1,12 +1,136 @@
 from piracyshield_data_storage.database.redis.document import DatabaseRedisDocument, DatabaseRedisSetException, DatabaseRedisGetException
 
+from redis.exceptions import RedisError
+
 class SecurityAntiBruteForceMemory(DatabaseRedisDocument):
 
+    api_requests_prefix = 'api_requests'
+
+    # sliding windows are sorted sets, kept apart from the fixed window counters
+    sliding_suffix = 'sliding'
+
+    scripts = {
+        **DatabaseRedisDocument.scripts,
+
+        # KEYS[1]: counter, ARGV[1]: amount, ARGV[2]: window in seconds
+        'fixed_window': """
+            local attempts = redis.call('INCRBY', KEYS[1], ARGV[1])
+            local ttl = redis.call('TTL', KEYS[1])
+
+            if ttl < 0 then
+                redis.call('EXPIRE', KEYS[1], ARGV[2])
+                ttl = tonumber(ARGV[2])
+            end
+
+            return {attempts, ttl}
+        """,
+
+        # KEYS[1]: sorted set of hits scored in milliseconds, ARGV[1]: amount, ARGV[2]: window in seconds, ARGV[3]: limit
+        'sliding_window': """
+            local time = redis.call('TIME')
+            local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+            local window = tonumber(ARGV[2]) * 1000
+
+            redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+
+            local attempts = redis.call('ZCARD', KEYS[1]) + tonumber(ARGV[1])
+
+            -- rejected hits are not recorded, otherwise a busy caller would never get through
+            if attempts <= tonumber(ARGV[3]) then
+                for hit = 1, tonumber(ARGV[1]) do
+                    local suffix = 0
+
+                    while redis.call('ZADD', KEYS[1], 'NX', now, time[1] .. time[2] .. ':' .. hit .. ':' .. suffix) == 0 do
+                        suffix = suffix + 1
+                    end
+                end
+
+                redis.call('PEXPIRE', KEYS[1], window)
+            end
+
+            local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+            local ttl = tonumber(ARGV[2])
+
+            if oldest[2] then
+                ttl = math.ceil((tonumber(oldest[2]) + window - now) / 1000)
+            end
+
+            return {attempts, ttl}
+        """
+    }
+
     def __init__(self, database: int):
         super().__init__()
 
         self.establish(database)
 
+    def hit_login_attempts(self, email: str, limit: int, timeframe: int, ip_address: str = None) -> dict | Exception:
+        """
+        Atomically counts a login attempt in a fixed window.
+
+        :param email: a valid e-mail address.
+        :param limit: attempts allowed in the timeframe.
+        :param timeframe: a timeframe in seconds, starting from the first attempt.
+        :param ip_address: optionally count the attempts per e-mail address and IP address.
+        :return: dictionary with attempts, remaining, ttl and allowed.
+        """
+
+        return self.hit(
+            key = self._get_login_attempts_key(email, ip_address),
+            limit = limit,
+            timeframe = timeframe
+        )
+
+    def hit_api_requests(self, account_id: str, limit: int, timeframe: int, sliding: bool = True) -> dict | Exception:
+        """
+        Atomically counts an API request of an account.
+
+        :param account_id: a valid account identifier.
+        :param limit: requests allowed in the timeframe.
+        :param timeframe: a timeframe in seconds.
+        :param sliding: use a sliding window instead of a fixed one.
+        :return: dictionary with attempts, remaining, ttl and allowed.
+        """
+
+        return self.hit(
+            key = f'{self.api_requests_prefix}:{account_id}',
+            limit = limit,
+            timeframe = timeframe,
+            sliding = sliding
+        )
+
+    def hit(self, key: str, limit: int, timeframe: int, sliding: bool = False, amount: int = 1) -> dict | Exception:
+        """
+        Increments a rate limit counter, sets its expiry on the first hit and returns the outcome, in one round trip.
+
+        :param key: the counter key.
+        :param limit: hits allowed in the timeframe.
+        :param timeframe: a timeframe in seconds.
+        :param sliding: use a sliding window, rejected hits are then not counted.
+        :param amount: increment by a number, default: 1.
+        :return: dictionary with attempts, remaining, ttl and allowed.
+        """
+
+        try:
+            if sliding:
+                attempts, ttl = self.run_script(
+                    'sliding_window',
+                    keys = [f'{key}:{self.sliding_suffix}'],
+                    args = [amount, timeframe, limit]
+                )
+
+            else:
+                attempts, ttl = self.run_script(
+                    'fixed_window',
+                    keys = [key],
+                    args = [amount, timeframe]
+                )
+
+        except RedisError:
+            raise SecurityAntiBruteForceMemorySetException()
+
+        return self._get_rate_limit(attempts, ttl, limit)
+
     def set_login_attempts(self, email: str, timeframe: int, attempts: int = 1) -> bool | Exception:
         """
         Sets the current login attempts in a given timeframe.
@@ -19,13 +143,13 @@ class SecurityAntiBruteForceMemory(DatabaseRedisDocument):
 
         try:
             return self.set_with_expiry(
-                key = email,
+                key = self._get_login_attempts_key(email),
                 value = attempts, # store the correct types
                 expiry = timeframe
             )
 
         except DatabaseRedisSetException:
-            raise SecurityMemorySetException()
+            raise SecurityAntiBruteForceMemorySetException()
 
     def increment_login_attempts(self, email: str, amount: int = 1) -> bool | Exception:
         """
@@ -38,12 +162,12 @@ class SecurityAntiBruteForceMemory(DatabaseRedisDocument):
 
         try:
             return self.incr(
-                key = email,
+                key = self._get_login_attempts_key(email),
                 amount = amount
             )
 
         except DatabaseRedisSetException:
-            raise SecurityMemorySetException()
+            raise SecurityAntiBruteForceMemorySetException()
 
     def get_login_attempts(self, email: str) -> int | Exception:
         """
@@ -54,7 +178,7 @@ class SecurityAntiBruteForceMemory(DatabaseRedisDocument):
         """
 
         try:
-            response = self.get(key = email)
+            response = self.get(key = self._get_login_attempts_key(email))
 
             if response:
                 # make sure we're dealing with a true int and not a string
@@ -63,7 +187,7 @@ class SecurityAntiBruteForceMemory(DatabaseRedisDocument):
             return response
 
         except DatabaseRedisGetException:
-            raise SecurityMemoryGetException()
+            raise SecurityAntiBruteForceMemoryGetException()
 
     def reset_login_attempts(self, email: str) -> bool | Exception:
         """
@@ -75,11 +199,26 @@ class SecurityAntiBruteForceMemory(DatabaseRedisDocument):
 
         try:
             return self.delete(
-                key = email
+                key = self._get_login_attempts_key(email)
             )
 
         except DatabaseRedisSetException:
-            raise SecurityMemorySetException()
+            raise SecurityAntiBruteForceMemorySetException()
+
+    def _get_rate_limit(self, attempts: int, ttl: int, limit: int) -> dict:
+        return {
+            'attempts': int(attempts),
+            'remaining': max(limit - int(attempts), 0),
+            'ttl': int(ttl),
+            'allowed': int(attempts) <= limit
+        }
+
+    def _get_login_attempts_key(self, email: str, ip_address: str = None) -> str:
+        # attempts are stored under the bare e-mail address
+        if ip_address:
+            return f'{email}:{ip_address}'
+
+        return email
 
 class SecurityAntiBruteForceMemorySetException(Exception):
 
@@ -0,0 +1,202 @@
+from piracyshield_data_storage.database.redis.asyncio.document import DatabaseRedisAsyncDocument
+from piracyshield_data_storage.database.redis.document import DatabaseRedisSetException, DatabaseRedisGetException
+from piracyshield_data_storage.security.blacklist.memory import SecurityBlacklistMemory, SecurityBlacklistMemorySetException, SecurityBlacklistMemoryGetException
+
+from redis.exceptions import RedisError
+
+class SecurityBlacklistAsyncMemory(DatabaseRedisAsyncDocument):
+
+    """
+    Asyncio counterpart of SecurityBlacklistMemory.
+    The lookups are not cached in process, the writes still invalidate the caches of the synchronous storages.
+    """
+
+    ip_address_prefix = SecurityBlacklistMemory.ip_address_prefix
+
+    token_prefix = SecurityBlacklistMemory.token_prefix
+
+    invalidation_channel = SecurityBlacklistMemory.invalidation_channel
+
+    def __init__(self, database: int):
+        super().__init__()
+
+        self.establish(database)
+
+        self.database = database
+
+    async def add_ip_address(self, ip_address: str, duration: int = 60) -> bool | Exception:
+        """
+        Blacklists an IP address.
+
+        :param ip_address: a valid IP address.
+        :param duration: duration of the blacklist in seconds.
+        :return: true if the item has been stored.
+        """
+
+        try:
+            return await self._add(
+                key = self._get_ip_address_key(ip_address),
+                duration = duration
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityBlacklistMemorySetException()
+
+    async def exists_by_ip_address(self, ip_address: str) -> bool | Exception:
+        """
+        Verifies if an IP address is in the blacklist.
+
+        :param ip_address: a valid IP address.
+        :return: returns the TTL of the item.
+        """
+
+        try:
+            return await self.instance.exists(self._get_ip_address_key(ip_address)) > 0
+
+        except DatabaseRedisGetException:
+            raise SecurityBlacklistMemoryGetException()
+
+    async def remove_ip_address(self, ip_address: str) -> bool | Exception:
+        """
+        Removes an IP address from the blacklist.
+
+        :param ip_address: a valid IP address.
+        :return: true if the item has been removed.
+        """
+
+        try:
+            return await self._remove(
+                key = self._get_ip_address_key(ip_address)
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityBlacklistMemorySetException()
+
+    async def add_refresh_token(self, refresh_token: str, duration: int) -> bool | Exception:
+        """
+        Blacklists a refresh token.
+
+        :param refresh_token: an active refresh token.
+        :param duration: duration of the blacklist in seconds.
+        :return: true if the item has been stored.
+        """
+
+        try:
+            return await self._add(
+                key = self._get_token_key(refresh_token),
+                duration = duration
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityBlacklistMemorySetException()
+
+    async def exists_by_refresh_token(self, refresh_token: str) -> bool | Exception:
+        """
+        Verifies if a refresh token is in the blacklist.
+
+        :param refresh_token: a valid refresh token.
+        :return: returns the TTL of the item.
+        """
+
+        try:
+            return await self.instance.exists(*self._get_token_keys(refresh_token)) > 0
+
+        except DatabaseRedisGetException:
+            raise SecurityBlacklistMemoryGetException()
+
+    async def add_access_token(self, access_token: str, duration: int) -> bool | Exception:
+        """
+        Blacklists an access token.
+
+        :param access_token: an active access token.
+        :param duration: duration of the blacklist in seconds.
+        :return: true if the item has been stored.
+        """
+
+        try:
+            return await self._add(
+                key = self._get_token_key(access_token),
+                duration = duration
+            )
+
+        except DatabaseRedisSetException:
+            raise SecurityBlacklistMemorySetException()
+
+    async def exists_by_access_token(self, access_token: str) -> bool | Exception:
+        """
+        Verifies if an access token is in the blacklist.
+
+        :param access_token: a valid access token.
+        :return: returns the TTL of the item.
+        """
+
+        try:
+            return await self.instance.exists(*self._get_token_keys(access_token)) > 0
+
+        except DatabaseRedisGetException:
+            raise SecurityBlacklistMemoryGetException()
+
+    async def add_tokens(self, tokens: dict) -> int | Exception:
+        """
+        Blacklists many refresh or access tokens in one round trip.
+
+        :param tokens: tokens mapped to the duration of their blacklist in milliseconds; with compact keys a token can also be given by its digest.
+        :return: the number of blacklisted tokens.
+        """
+
+        keys = self._get_tokens_keys(tokens)
+
+        publish = self._is_cache_configured()
+
+        try:
+            pipeline = self.instance.pipeline()
+
+            for key, duration in keys.items():
+                pipeline.set(key, '1', px = duration)
+
+                if publish:
+                    pipeline.publish(self._get_invalidation_channel(), key)
+
+            await pipeline.execute()
+
+        except RedisError:
+            raise SecurityBlacklistMemorySetException()
+
+        return len(keys)
+
+    async def _add(self, key: str, duration: int) -> bool | Exception:
+        if await self._execute_and_invalidate(key, 'set', key, '1', ex = duration) == True:
+            return True
+
+        raise DatabaseRedisSetException()
+
+    async def _remove(self, key: str) -> any:
+        return await self._execute_and_invalidate(key, 'delete', key)
+
+    async def _execute_and_invalidate(self, key: str, command: str, *args, **kwargs) -> any:
+        # keeps the caches of the synchronous storages in line
+        if self._is_cache_configured():
+            pipeline = self.instance.pipeline()
+
+            getattr(pipeline, command)(*args, **kwargs)
+
+            pipeline.publish(self._get_invalidation_channel(), key)
+
+            return (await pipeline.execute())[0]
+
+        return await getattr(self.instance, command)(*args, **kwargs)
+
+    def _is_cache_configured(self) -> bool:
+        return SecurityBlacklistMemory.cache_enabled
+
+    _get_invalidation_channel = SecurityBlacklistMemory._get_invalidation_channel
+
+    _get_ip_address_key = SecurityBlacklistMemory._get_ip_address_key
+
+    _get_token_key = SecurityBlacklistMemory._get_token_key
+
+    _get_token_keys = SecurityBlacklistMemory._get_token_keys
+
+    _get_tokens_keys = SecurityBlacklistMemory._get_tokens_keys
+
+    _get_legacy_token_key = SecurityBlacklistMemory._get_legacy_token_key
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+import threading
+import time
+
+class SecurityBlacklistCache:
+
+    """
+    Bounded LRU cache with expiring entries, shared by the blacklist storages of a process.
+
+    Every invalidation bumps a generation number: a value read from Redis is only stored
+    if no invalidation happened since the read started, so a revocation cannot be overwritten by a stale answer.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        """
+        :param size: maximum number of entries.
+        :param ttl: seconds an entry is trusted without asking Redis again.
+        """
+
+        self.size = size
+
+        self.ttl = ttl
+
+        self.generation = 0
+
+        self.hits = 0
+
+        self.misses = 0
+
+        self._lock = threading.Lock()
+
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> tuple:
+        """
+        Looks up a key.
+
+        :param key: the Redis key.
+        :return: a tuple with a found flag and the cached value.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+
+                return False, None
+
+            self._entries.move_to_end(key)
+
+            self.hits += 1
+
+            return True, entry[0]
+
+    def set(self, key: str, value: any, generation: int) -> None:
+        """
+        Stores a value read from Redis.
+
+        :param key: the Redis key.
+        :param value: the value to cache.
+        :param generation: the generation observed before reading the value.
+        """
+
+        with self._lock:
+            if generation != self.generation:
+                return
+
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last = False)
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drops a key.
+
+        :param key: the Redis key.
+        """
+
+        with self._lock:
+            self.generation += 1
+
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+
+        with self._lock:
+            self.generation += 1
+
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Usage statistics of the cache.
+
+        :return: dictionary with hits, misses, hit rate and number of entries.
+        """
+
+        with self._lock:
+            total = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries)
+            }
@@ -1,4 +1,10 @@
 from piracyshield_data_storage.database.redis.document import DatabaseRedisDocument, DatabaseRedisSetException, DatabaseRedisGetException
+from piracyshield_data_storage.security.blacklist.cache import SecurityBlacklistCache
+
+from redis.exceptions import RedisError
+
+import os
+import threading
 
 class SecurityBlacklistMemory(DatabaseRedisDocument):
 
@@ -6,11 +12,40 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
 
     token_prefix = 'token'
 
-    def __init__(self, database: int):
+    # in-process cache of the lookups, disabled by default
+    cache_enabled = False
+
+    cache_size = 100000
+
+    # upper bound of the delay before a revocation is seen by every process
+    cache_ttl = 5
+
+    # writes are announced here so the other processes drop their cached answer
+    invalidation_channel = 'blacklist_invalidation'
+
+    # shared by every blacklist storage of this process, keyed by database index
+    _caches = {}
+
+    _subscribers = {}
+
+    _pid = os.getpid()
+
+    _lock = threading.Lock()
+
+    def __init__(self, database: int, cache: bool = None):
+        """
+        :param database: database index of the blacklist.
+        :param cache: enable the in-process cache, defaults to `cache_enabled`.
+        """
+
         super().__init__()
 
         self.establish(database)
 
+        self.database = database
+
+        self.cache = self._get_cache() if (self.cache_enabled if cache is None else cache) else None
+
     def add_ip_address(self, ip_address: str, duration: int = 60) -> bool | Exception:
         """
         Blacklists an IP address.
@@ -21,10 +56,9 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            return self.set_with_expiry(
-                key = f'{self.ip_address_prefix}:{ip_address}',
-                value = '1',
-                expiry = duration
+            return self._add(
+                key = self._get_ip_address_key(ip_address),
+                duration = duration
             )
 
         except DatabaseRedisSetException:
@@ -39,12 +73,7 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            response = self.get(key = f'{self.ip_address_prefix}:{ip_address}')
-
-            if response:
-                return True
-
-            return False
+            return self._exists(self._get_ip_address_key(ip_address))
 
         except DatabaseRedisGetException:
             raise SecurityBlacklistMemoryGetException()
@@ -58,8 +87,8 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            return self.delete(
-                key = f'{self.ip_address_prefix}:{ip_address}'
+            return self._remove(
+                key = self._get_ip_address_key(ip_address)
             )
 
         except DatabaseRedisSetException:
@@ -75,10 +104,9 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            return self.set_with_expiry(
-                key = f'{self.token_prefix}:{refresh_token}',
-                value = '1',
-                expiry = duration
+            return self._add(
+                key = self._get_token_key(refresh_token),
+                duration = duration
             )
 
         except DatabaseRedisSetException:
@@ -93,12 +121,7 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            response = self.get(key = f'{self.token_prefix}:{refresh_token}')
-
-            if response:
-                return True
-
-            return False
+            return self._exists(*self._get_token_keys(refresh_token))
 
         except DatabaseRedisGetException:
             raise SecurityBlacklistMemoryGetException()
@@ -113,10 +136,9 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            return self.set_with_expiry(
-                key = f'{self.token_prefix}:{access_token}',
-                value = '1',
-                expiry = duration
+            return self._add(
+                key = self._get_token_key(access_token),
+                duration = duration
             )
 
         except DatabaseRedisSetException:
@@ -131,16 +153,151 @@ class SecurityBlacklistMemory(DatabaseRedisDocument):
         """
 
         try:
-            response = self.get(key = f'{self.token_prefix}:{access_token}')
-
-            if response:
-                return True
-
-            return False
+            return self._exists(*self._get_token_keys(access_token))
 
         except DatabaseRedisGetException:
             raise SecurityBlacklistMemoryGetException()
 
+    def add_tokens(self, tokens: dict) -> int | Exception:
+        """
+        Blacklists many refresh or access tokens in one round trip.
+
+        :param tokens: tokens mapped to the duration of their blacklist in milliseconds; with compact keys a token can also be given by its digest.
+        :return: the number of blacklisted tokens.
+        """
+
+        keys = self._get_tokens_keys(tokens)
+
+        publish = self._is_cache_configured()
+
+        try:
+            pipeline = self.instance.pipeline()
+
+            for key, duration in keys.items():
+                pipeline.set(key, '1', px = duration)
+
+                if publish:
+                    pipeline.publish(self._get_invalidation_channel(), key)
+
+            pipeline.execute()
+
+        except RedisError:
+            raise SecurityBlacklistMemorySetException()
+
+        if self.cache is not None:
+            for key in keys:
+                self.cache.invalidate(key)
+
+        return len(keys)
+
+    def _add(self, key: str, duration: int) -> bool | Exception:
+        if self._execute_and_invalidate(key, 'set', key, '1', ex = duration) == True:
+            return True
+
+        raise DatabaseRedisSetException()
+
+    def _remove(self, key: str) -> any:
+        return self._execute_and_invalidate(key, 'delete', key)
+
+    def _exists(self, key: str, *legacy_keys: str) -> bool:
+        # answers are cached under the current key only
+        if self.cache is None:
+            return self.instance.exists(key, *legacy_keys) > 0
+
+        found, value = self.cache.get(key)
+
+        if found:
+            return value
+
+        generation = self.cache.generation
+
+        value = self.instance.exists(key, *legacy_keys) > 0
+
+        self.cache.set(key, value, generation)
+
+        return value
+
+    def _execute_and_invalidate(self, key: str, command: str, *args, **kwargs) -> any:
+        # the other processes are told in the same round trip, only if they may have cached the answer
+        if self._is_cache_configured():
+            pipeline = self.instance.pipeline()
+
+            getattr(pipeline, command)(*args, **kwargs)
+
+            pipeline.publish(self._get_invalidation_channel(), key)
+
+            result = pipeline.execute()[0]
+
+        else:
+            result = getattr(self.instance, command)(*args, **kwargs)
+
+        if self.cache is not None:
+            self.cache.invalidate(key)
+
+        return result
+
+    def _is_cache_configured(self) -> bool:
+        return self.cache is not None or SecurityBlacklistMemory.cache_enabled
+
+    def _get_cache(self) -> SecurityBlacklistCache:
+        with SecurityBlacklistMemory._lock:
+            # a forked child must not share the subscriber thread of its parent
+            if SecurityBlacklistMemory._pid != os.getpid():
+                SecurityBlacklistMemory._pid = os.getpid()
+
+                SecurityBlacklistMemory._caches = {}
+
+                SecurityBlacklistMemory._subscribers = {}
+
+            if self.database not in self._caches:
+                cache = self._caches[self.database] = SecurityBlacklistCache(self.cache_size, self.cache_ttl)
+
+                self._subscribers[self.database] = self._subscribe(cache)
+
+            return self._caches[self.database]
+
+    def _subscribe(self, cache: SecurityBlacklistCache) -> threading.Thread:
+        pubsub = self.instance.pubsub(ignore_subscribe_messages = True)
+
+        pubsub.subscribe(**{
+            self._get_invalidation_channel(): lambda message: cache.invalidate(message['data'])
+        })
+
+        def on_error(error: Exception, pubsub: any, thread: threading.Thread) -> None:
+            # invalidations may have been lost while disconnected
+            cache.clear()
+
+        return pubsub.run_in_thread(sleep_time = 1, daemon = True, exception_handler = on_error)
+
+    def _get_invalidation_channel(self) -> str:
+        return f'{self.invalidation_channel}:{self.database}'
+
+    def _get_ip_address_key(self, ip_address: str) -> str:
+        return f'{self.ip_address_prefix}:{ip_address}'
+
+    def _get_token_key(self, token: str) -> str:
+        if self.compact_keys:
+            return f'{self.token_prefix}:{self._get_digest(token)}'
+
+        return self._get_legacy_token_key(token)
+
+    def _get_tokens_keys(self, tokens: dict) -> dict:
+        # session keys only hold the digest of their token when compact keys are enabled
+        return {
+            f'{self.token_prefix}:{token}' if self.compact_keys and self._is_digest(token) else self._get_token_key(token): duration
+            for token, duration in tokens.items()
+        }
+
+    def _get_token_keys(self, token: str) -> list:
+        # the token may have been blacklisted before compact keys were enabled
+        if self.compact_keys and self.legacy_keys_fallback:
+            return [self._get_token_key(token), self._get_legacy_token_key(token)]
+
+        return [self._get_token_key(token)]
+
+    def _get_legacy_token_key(self, token: str) -> str:
+        return f'{self.token_prefix}:{token}'
+
 class SecurityBlacklistMemorySetException(Exception):
 
     """
@@ -0,0 +1,67 @@
+from piracyshield_data_storage.security.blacklist.asyncio.memory import SecurityBlacklistAsyncMemory
+from piracyshield_data_storage.security.anti_brute_force.asyncio.memory import SecurityAntiBruteForceAsyncMemory
+from piracyshield_data_storage.security.guard.memory import SecurityGuardMemory, SecurityGuardVerdict, SecurityGuardMemoryGetException
+
+from redis.exceptions import RedisError
+
+import asyncio
+
+class SecurityGuardAsyncMemory:
+
+    """
+    Asyncio counterpart of SecurityGuardMemory.
+    The blacklist lookups always reach Redis, the in-process cache is only available to the synchronous guard.
+    """
+
+    def __init__(self, blacklist_database: int, anti_brute_force_database: int):
+        self.blacklist = SecurityBlacklistAsyncMemory(database = blacklist_database)
+
+        self.anti_brute_force = SecurityAntiBruteForceAsyncMemory(database = anti_brute_force_database)
+
+        self.shared_database = blacklist_database == anti_brute_force_database
+
+    async def check(self, ip_address: str = None, token: str = None, email: str = None) -> SecurityGuardVerdict | Exception:
+        """
+        Verifies an IP address, a refresh or access token and the login attempts at once.
+
+        :param ip_address: a valid IP address.
+        :param token: a valid refresh or access token.
+        :param email: a valid e-mail address, only needed on login.
+        :return: the verdict of the checks.
+        """
+
+        blacklist_keys, anti_brute_force_keys = self._get_keys(ip_address, token, email)
+
+        try:
+            if self.shared_database:
+                values = await self._mget(self.blacklist, self._flatten(blacklist_keys) + anti_brute_force_keys)
+
+            else:
+                # the two databases are queried concurrently
+                blacklist_values, anti_brute_force_values = await asyncio.gather(
+                    self._mget(self.blacklist, self._flatten(blacklist_keys)),
+                    self._mget(self.anti_brute_force, anti_brute_force_keys)
+                )
+
+                values = blacklist_values + anti_brute_force_values
+
+        except RedisError:
+            raise SecurityGuardMemoryGetException()
+
+        answers, values = self._get_answers(blacklist_keys, values)
+
+        return self._get_verdict(ip_address, token, email, [answers[keys[0]] for keys in blacklist_keys] + values)
+
+    _get_answers = SecurityGuardMemory._get_answers
+
+    _flatten = SecurityGuardMemory._flatten
+
+    _get_keys = SecurityGuardMemory._get_keys
+
+    _get_verdict = SecurityGuardMemory._get_verdict
+
+    async def _mget(self, memory: any, keys: list) -> list:
+        if not keys:
+            return []
+
+        return await memory.instance.mget(keys)
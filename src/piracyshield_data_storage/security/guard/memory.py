@@ -0,0 +1,159 @@
+from piracyshield_data_storage.security.blacklist.memory import SecurityBlacklistMemory
+from piracyshield_data_storage.security.anti_brute_force.memory import SecurityAntiBruteForceMemory
+
+from redis.exceptions import RedisError
+
+class SecurityGuardVerdict:
+
+    """
+    Outcome of the security checks of a single request.
+    """
+
+    def __init__(self, ip_address_blacklisted: bool = False, token_blacklisted: bool = False, login_attempts: int = 0):
+        """
+        :param ip_address_blacklisted: the IP address is in the blacklist.
+        :param token_blacklisted: the refresh or access token is in the blacklist.
+        :param login_attempts: the current login attempts of the account.
+        """
+
+        self.ip_address_blacklisted = ip_address_blacklisted
+
+        self.token_blacklisted = token_blacklisted
+
+        self.login_attempts = login_attempts
+
+    @property
+    def blacklisted(self) -> bool:
+        return self.ip_address_blacklisted or self.token_blacklisted
+
+    def __repr__(self) -> str:
+        return f'SecurityGuardVerdict(ip_address_blacklisted={self.ip_address_blacklisted}, token_blacklisted={self.token_blacklisted}, login_attempts={self.login_attempts})'
+
+class SecurityGuardMemory:
+
+    """
+    Runs the blacklist and anti brute force lookups of a request in a single round trip,
+    or two sequential ones when they are kept in different databases.
+    """
+
+    def __init__(self, blacklist_database: int, anti_brute_force_database: int, cache: bool = None):
+        """
+        :param blacklist_database: database index of the blacklist.
+        :param anti_brute_force_database: database index of the login attempts.
+        :param cache: answer the blacklist lookups from the in-process cache, defaults to `SecurityBlacklistMemory.cache_enabled`.
+        """
+
+        self.blacklist = SecurityBlacklistMemory(database = blacklist_database, cache = cache)
+
+        self.anti_brute_force = SecurityAntiBruteForceMemory(database = anti_brute_force_database)
+
+        # a single MGET covers every key only when they live in the same database
+        self.shared_database = blacklist_database == anti_brute_force_database
+
+    def check(self, ip_address: str = None, token: str = None, email: str = None) -> SecurityGuardVerdict | Exception:
+        """
+        Verifies an IP address, a refresh or access token and the login attempts at once.
+        With different databases each one takes its own MGET, one after the other as a synchronous client cannot overlap them:
+        share the database, or use SecurityGuardAsyncMemory which issues both concurrently, to keep a single round trip.
+
+        :param ip_address: a valid IP address.
+        :param token: a valid refresh or access token.
+        :param email: a valid e-mail address, only needed on login.
+        :return: the verdict of the checks.
+        """
+
+        blacklist_keys, anti_brute_force_keys = self._get_keys(ip_address, token, email)
+
+        # generation observed before reading, see SecurityBlacklistCache
+        generation = self.blacklist.cache.generation if self.blacklist.cache is not None else None
+
+        cached = self._get_cached(blacklist_keys)
+
+        # only the answers missing from the cache leave the process
+        missing = [keys for keys in blacklist_keys if keys[0] not in cached]
+
+        try:
+            if self.shared_database:
+                values = self._mget(self.blacklist, self._flatten(missing) + anti_brute_force_keys)
+
+            else:
+                values = self._mget(self.blacklist, self._flatten(missing)) + self._mget(self.anti_brute_force, anti_brute_force_keys)
+
+        except RedisError:
+            raise SecurityGuardMemoryGetException()
+
+        answers, values = self._get_answers(missing, values)
+
+        for key, value in answers.items():
+            cached[key] = value
+
+            if generation is not None:
+                self.blacklist.cache.set(key, value, generation)
+
+        return self._get_verdict(ip_address, token, email, [cached[keys[0]] for keys in blacklist_keys] + values)
+
+    def _get_cached(self, blacklist_keys: list) -> dict:
+        cached = {}
+
+        if self.blacklist.cache is None:
+            return cached
+
+        for keys in blacklist_keys:
+            found, value = self.blacklist.cache.get(keys[0])
+
+            if found:
+                cached[keys[0]] = value
+
+        return cached
+
+    def _get_answers(self, blacklist_keys: list, values: list) -> tuple:
+        # an item is blacklisted if any of its keys, current or legacy, exists
+        answers = {}
+
+        position = 0
+
+        for keys in blacklist_keys:
+            answers[keys[0]] = any(values[position:position + len(keys)])
+
+            position += len(keys)
+
+        return answers, values[position:]
+
+    def _flatten(self, blacklist_keys: list) -> list:
+        return [key for keys in blacklist_keys for key in keys]
+
+    def _get_keys(self, ip_address: str | None, token: str | None, email: str | None) -> tuple:
+        blacklist_keys = []
+
+        if ip_address:
+            blacklist_keys.append([self.blacklist._get_ip_address_key(ip_address)])
+
+        if token:
+            blacklist_keys.append(self.blacklist._get_token_keys(token))
+
+        anti_brute_force_keys = [self.anti_brute_force._get_login_attempts_key(email)] if email else []
+
+        return blacklist_keys, anti_brute_force_keys
+
+    def _get_verdict(self, ip_address: str | None, token: str | None, email: str | None, values: list) -> SecurityGuardVerdict:
+        values = iter(values)
+
+        return SecurityGuardVerdict(
+            ip_address_blacklisted = bool(next(values)) if ip_address else False,
+            token_blacklisted = bool(next(values)) if token else False,
+            login_attempts = int(next(values) or 0) if email else 0
+        )
+
+    def _mget(self, memory: any, keys: list) -> list:
+        if not keys:
+            return []
+
+        return memory.instance.mget(keys)
+
+class SecurityGuardMemoryGetException(Exception):
+
+    """
+    Cannot get the value.
+    """
+
+    pass
@@ -6,6 +6,11 @@ class TicketErrorStorage(DatabaseArangodbDocument):
 
     collection_name = 'ticket_errors'
 
+    indexes = [
+        { 'fields': ['ticket_error_id'] },
+        { 'fields': ['ticket_id'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
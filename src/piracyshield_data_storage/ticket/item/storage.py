@@ -1,15 +1,37 @@
-from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument
+from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument, DatabaseArangodbQueryException
+from piracyshield_data_storage.database.arangodb.cursor import DatabaseArangodbPrefetchCursorException
 
 from arango.cursor import Cursor
 
+from typing import Iterator
+
 class TicketItemStorage(DatabaseArangodbDocument):
 
     ticket_collection_name = 'ticket_blockings'
 
     collection_name = 'ticket_blocking_items'
 
+    removal_collection_name = 'ticket_blocking_item_removals'
+
+    # every write changing the items visible to providers takes the next value of this sequence
+    revision_sequence = 'ticket_blocking_items'
+
+    indexes = [
+        { 'fields': ['ticket_id', 'genre'] },
+        { 'fields': ['ticket_id', 'value'] },
+        { 'fields': ['genre', 'value'] },
+        { 'fields': ['value', 'provider_id'] },
+        { 'fields': ['provider_id', 'genre', 'is_active'] },
+        { 'fields': ['provider_id', 'genre', 'revision'] },
+        { 'collection': 'ticket_blocking_item_removals', 'fields': ['provider_id', 'genre', 'revision'] },
+        { 'collection': 'ticket_blocking_item_removals', 'fields': ['revision'] }
+    ]
+
     collection_instance = None
 
+    # maximum number of items processed by a single bulk update query
+    max_update_size = 1000
+
     def __init__(self):
         super().__init__()
 
@@ -24,21 +46,33 @@ class TicketItemStorage(DatabaseArangodbDocument):
         """
 
         try:
-            return self.collection_instance.insert(document)
+            revision = self._reserve_revision(self.revision_sequence)
+
+            try:
+                return self.collection_instance.insert({ **document, 'revision': revision })
+
+            finally:
+                self._release_revision(self.revision_sequence, revision)
 
         except:
             raise TicketItemStorageCreateException()
 
     def insert_many(self, documents: list) -> dict | Exception:
         """
-        Adds a batch of new ticket items.
+        Adds a batch of new ticket items, all stamped with the same revision.
 
         :param documents: a list of dictionary ticket items.
-        :return: cursor with the inserted data.
+        :return: list with the metadata of each inserted item, or the error raised by it.
         """
 
         try:
-            return self.collection_instance.insert_many(documents)
+            revision = self._reserve_revision(self.revision_sequence)
+
+            try:
+                return self.collection_instance.insert_many([{ **document, 'revision': revision } for document in documents])
+
+            finally:
+                self._release_revision(self.revision_sequence, revision)
 
         except:
             raise TicketItemStorageCreateException()
@@ -561,6 +595,65 @@ class TicketItemStorage(DatabaseArangodbDocument):
         except:
             raise TicketItemStorageGetException()
 
+    def get_genres(self) -> list | Exception:
+        """
+        Gets the genres of the stored items.
+        The scan only runs again once the items have changed.
+
+        :return: a list of genres.
+        """
+
+        aql = f"""
+            FOR document IN {self.collection_name}
+
+            // follows the (genre, value) index
+            COLLECT genre = document.genre OPTIONS {{ method: 'sorted' }}
+
+            RETURN genre
+        """
+
+        try:
+            return self.query_cached(self.collection_instance, aql)
+
+        except:
+            raise TicketItemStorageGetException()
+
+    def get_active_values(self, genres: list = None) -> Iterator[tuple] | Exception:
+        """
+        Streams the ticket items without any unblocked items, one genre after the other.
+        Unlike `get_active` the values are never collected in memory, neither on the server nor here.
+
+        :param genres: the genres to export, defaults to every stored genre.
+        :return: an iterator of (genre, value) pairs.
+        """
+
+        aql = f"""
+            FOR document IN {self.collection_name}
+
+            FILTER
+                document.genre == @genre AND
+                // filter out ticket items removed by reported errors
+                document.is_error == false
+
+            // follows the (genre, value) index, duplicates are adjacent
+            SORT document.value
+
+            RETURN document.value
+        """
+
+        try:
+            for genre in genres or self.get_genres():
+                previous = None
+
+                for value in self.iterate(aql, bind_vars = { 'genre': genre }):
+                    if value != previous:
+                        yield (genre, value)
+
+                    previous = value
+
+        except (DatabaseArangodbQueryException, DatabaseArangodbPrefetchCursorException):
+            raise TicketItemStorageGetException()
+
     def exists_by_value(self, genre: str, value: str) -> Cursor | Exception:
         """
         Searches for a duplicate.
@@ -596,6 +689,41 @@ class TicketItemStorage(DatabaseArangodbDocument):
         except:
             raise TicketItemStorageGetException()
 
+    def exists_by_values(self, items: list) -> Cursor | Exception:
+        """
+        Searches for duplicates of many items in a single query.
+
+        :param items: a list of (genre, value) pairs.
+        :return: cursor with the requested data.
+        """
+
+        aql = f"""
+            FOR item IN @items
+
+            FOR document IN {self.collection_name}
+
+            FILTER
+                document.genre == item.genre AND
+                document.value == item.value AND
+                document.is_active == true AND
+                document.is_duplicate == false AND
+                document.is_whitelisted == false
+
+            RETURN DISTINCT {{
+                'ticket_id': document.ticket_id,
+                'genre': document.genre,
+                'value': document.value
+            }}
+        """
+
+        try:
+            return self.query(aql, bind_vars = {
+                'items': [{ 'genre': genre, 'value': value } for genre, value in items]
+            })
+
+        except:
+            raise TicketItemStorageGetException()
+
     def update_status_by_value(self,
         provider_id: str,
         value: str,
@@ -668,6 +796,103 @@ class TicketItemStorage(DatabaseArangodbDocument):
         except:
             raise TicketItemStorageUpdateException()
 
+    def update_status_by_values(self, provider_id: str, items: list, updated_at: str) -> list | Exception:
+        """
+        Sets the status of many items at once, in chunks of `max_update_size` items per query.
+
+        :param provider_id: the id of the provider account.
+        :param items: a list of dictionaries with `value`, `status` and optional `reason`, `timestamp`, `note`.
+        :param updated_at: a timestamp of the update date.
+        :return: a list of `value` and `outcome` (`updated`, `not_found` or `not_workable`) per item.
+        """
+
+        aql = f"""
+            LET documents = (
+                FOR document IN {self.collection_name}
+
+                FILTER
+                    document.value IN @items[*].value AND
+                    document.provider_id == @provider_id AND
+                    document.is_active == true AND
+                    document.is_duplicate == false AND
+                    document.is_whitelisted == false AND
+                    document.is_error == false
+
+                RETURN {{
+                    '_key': document._key,
+                    'ticket_id': document.ticket_id,
+                    'value': document.value
+                }}
+            )
+
+            // prevent editing a ticket item with a non workable ticket, resolved once per chunk
+            LET workable_tickets = (
+                FOR parent_ticket IN {self.ticket_collection_name}
+                    FILTER
+                        parent_ticket.ticket_id IN UNIQUE(documents[*].ticket_id) AND
+                        (parent_ticket.status == 'open' OR parent_ticket.status == 'closed')
+
+                RETURN parent_ticket.ticket_id
+            )
+
+            FOR item IN @items
+
+            LET matches = documents[* FILTER CURRENT.value == item.value]
+
+            LET updated = (
+                FOR match IN matches[* FILTER CURRENT.ticket_id IN workable_tickets]
+
+                UPDATE match._key WITH {{
+                    status: item.status,
+                    reason: item.reason,
+                    timestamp: item.timestamp,
+                    note: item.note,
+                    metadata: {{
+                        updated_at: @updated_at
+                    }}
+                }} IN {self.collection_name}
+
+                RETURN true
+            )
+
+            RETURN {{
+                'value': item.value,
+                'outcome': LENGTH(updated) ? 'updated' : (LENGTH(matches) ? 'not_workable' : 'not_found')
+            }}
+        """
+
+        # the last record wins when a value is reported more than once
+        records = {}
+
+        for item in items:
+            records[item['value']] = {
+                'value': item['value'],
+                'status': item['status'],
+                'reason': item.get('reason'),
+                'timestamp': item.get('timestamp'),
+                'note': item.get('note')
+            }
+
+        records = list(records.values())
+
+        outcomes = []
+
+        try:
+            for offset in range(0, len(records), self.max_update_size):
+                outcomes.extend(self.query(
+                    aql,
+                    bind_vars = {
+                        'provider_id': provider_id,
+                        'items': records[offset:offset + self.max_update_size],
+                        'updated_at': updated_at
+                    }
+                ))
+
+            return outcomes
+
+        except:
+            raise TicketItemStorageUpdateException()
+
     def set_flag_active(self, value: str, status: str) -> list | Exception:
         """
         Sets the item activity status.
@@ -683,14 +908,16 @@ class TicketItemStorage(DatabaseArangodbDocument):
             FILTER document.value == @value
 
             UPDATE document WITH {{
-                is_active: @status
+                is_active: @status,
+                revision: @revision
             }} IN {self.collection_name}
 
             RETURN NEW
         """
 
         try:
-            affected_rows = self.query(
+            affected_rows = self._query_with_revision(
+                self.revision_sequence,
                 aql,
                 bind_vars = {
                     'value': value,
@@ -722,14 +949,16 @@ class TicketItemStorage(DatabaseArangodbDocument):
                 document.value == @value
 
             UPDATE document WITH {{
-                is_error: @status
+                is_error: @status,
+                revision: @revision
             }} IN {self.collection_name}
 
             RETURN NEW
         """
 
         try:
-            affected_rows = self.query(
+            affected_rows = self._query_with_revision(
+                self.revision_sequence,
                 aql,
                 bind_vars = {
                     'ticket_id': ticket_id,
@@ -762,11 +991,14 @@ class TicketItemStorage(DatabaseArangodbDocument):
 
             REMOVE document IN {self.collection_name}
 
-            RETURN OLD
+            {self._get_removal_aql()}
+
+            RETURN document
         """
 
         try:
-            affected_rows = self.query(
+            affected_rows = self._query_with_revision(
+                self.revision_sequence,
                 aql,
                 bind_vars = {
                     'ticket_id': ticket_id,
@@ -796,6 +1028,186 @@ class TicketItemStorage(DatabaseArangodbDocument):
 
             REMOVE document IN {self.collection_name}
 
+            {self._get_removal_aql()}
+
+            RETURN document
+        """
+
+        try:
+            affected_rows = self._query_with_revision(
+                self.revision_sequence,
+                aql,
+                bind_vars = {
+                    'ticket_id': ticket_id
+                },
+                count = True
+            )
+
+            return affected_rows
+
+        except:
+            raise TicketItemStorageRemoveException()
+
+    def get_revision(self) -> int | Exception:
+        """
+        Gets the revision every write on the ticket items has committed up to.
+
+        :return: the current revision, 0 if nothing has been written yet.
+        """
+
+        aql = f"""
+            LET sequence = DOCUMENT('{self.sequence_collection_name}', @sequence)
+
+            RETURN {self._get_committed_revision_aql()}
+        """
+
+        try:
+            return self.query(aql, bind_vars = {
+                'sequence': self.revision_sequence
+            }).next()
+
+        except:
+            raise TicketItemStorageGetException()
+
+    def get_changes_by_provider(self, genre: str, provider_id: str, revision: int) -> Cursor | Exception:
+        """
+        Gets the values added to or removed from the provider blocklist since a revision.
+        Revision 0 returns the whole blocklist as added values.
+        The returned revision stops before the writes still running, so a value may be reported again by the next call.
+        When `is_complete` is false the removals older than the revision have been pruned,
+        or the items stored before revisions existed are not stamped yet (see `backfill_revisions`), and a full snapshot is needed.
+
+        :param genre: the genre of the ticket items.
+        :param provider_id: the id of the provider account.
+        :param revision: the revision returned by the previous call, 0 for the first one.
+        :return: cursor with the current `revision`, `is_complete`, `added` and `removed` values.
+        """
+
+        aql = f"""
+            LET sequence = DOCUMENT('{self.sequence_collection_name}', @sequence)
+
+            LET changed_values = UNION_DISTINCT(
+                (
+                    FOR document IN {self.collection_name}
+
+                    // the first call takes every item, including those stored before revisions existed
+                    FILTER
+                        document.provider_id == @provider_id AND
+                        document.genre == @genre AND
+                        (@revision == 0 OR document.revision > @revision)
+
+                    RETURN document.value
+                ),
+                (
+                    FOR removal IN {self.removal_collection_name}
+
+                    // nothing to remove on the first call
+                    FILTER
+                        @revision > 0 AND
+                        removal.provider_id == @provider_id AND
+                        removal.genre == @genre AND
+                        removal.revision > @revision
+
+                    RETURN removal.value
+                )
+            )
+
+            // a changed value is still blocked if any other ticket item keeps it available
+            LET available_values = (
+                FOR document IN {self.collection_name}
+
+                FILTER
+                    document.value IN changed_values AND
+                    document.genre == @genre AND
+                    document.is_active == true AND
+                    document.is_duplicate == false AND
+                    document.is_whitelisted == false AND
+                    document.is_error == false AND
+                    document.provider_id == @provider_id
+
+                // ensure only available tickets are considered
+                FOR parent_ticket IN {self.ticket_collection_name}
+                    FILTER
+                        parent_ticket.ticket_id == document.ticket_id AND
+                        (parent_ticket.status == 'open' OR parent_ticket.status == 'closed')
+
+                RETURN DISTINCT document.value
+            )
+
+            RETURN {{
+                'revision': {self._get_committed_revision_aql()},
+                'is_complete': @revision == 0 OR (@revision >= NOT_NULL(sequence.pruned, 0) AND sequence.backfilled == true),
+                'added': available_values,
+                'removed': MINUS(changed_values, available_values)
+            }}
+        """
+
+        try:
+            return self.query(aql, bind_vars = {
+                'sequence': self.revision_sequence,
+                'genre': genre,
+                'provider_id': provider_id,
+                'revision': revision
+            })
+
+        except:
+            raise TicketItemStorageGetException()
+
+    def backfill_revisions(self) -> list | Exception:
+        """
+        Stamps the items stored before revisions existed with a new revision, so the changes feed reports them.
+        Until this has run once, `get_changes_by_provider` asks the providers past revision 0 for a full snapshot.
+
+        :return: a list of stamped rows.
+        """
+
+        # the sequence stays locked until every item is stamped, so the revision is committed along with them
+        aql = f"""
+            {self._get_sequence_aql(fields = "'backfilled': true")}
+
+            FOR document IN {self.collection_name}
+
+            FILTER document.revision == null
+
+            UPDATE document WITH {{
+                revision: revision
+            }} IN {self.collection_name}
+
+            RETURN NEW._key
+        """
+
+        try:
+            affected_rows = self.query(
+                aql,
+                bind_vars = {
+                    'sequence': self.revision_sequence
+                },
+                count = True
+            )
+
+            return affected_rows
+
+        except:
+            raise TicketItemStorageUpdateException()
+
+    def remove_removals(self, revision: int) -> list | Exception:
+        """
+        Prunes the removal records up to a revision.
+        Providers polling from an older revision will be asked for a full snapshot.
+
+        :param revision: the last revision to prune.
+        :return: a list of pruned rows.
+        """
+
+        aql = f"""
+            {self._get_sequence_aql('current', increment = 0, fields = "'pruned': MAX([previous.pruned, @revision])")}
+
+            FOR removal IN {self.removal_collection_name}
+
+            FILTER removal.revision <= @revision
+
+            REMOVE removal IN {self.removal_collection_name}
+
             RETURN OLD
         """
 
@@ -803,7 +1215,8 @@ class TicketItemStorage(DatabaseArangodbDocument):
             affected_rows = self.query(
                 aql,
                 bind_vars = {
-                    'ticket_id': ticket_id
+                    'sequence': self.revision_sequence,
+                    'revision': revision
                 },
                 count = True
             )
@@ -813,6 +1226,18 @@ class TicketItemStorage(DatabaseArangodbDocument):
         except:
             raise TicketItemStorageRemoveException()
 
+    def _get_removal_aql(self) -> str:
+        # keeps track of the removed value for the providers changes feed
+        return f"""
+            INSERT {{
+                'ticket_id': document.ticket_id,
+                'provider_id': document.provider_id,
+                'genre': document.genre,
+                'value': document.value,
+                'revision': @revision
+            }} INTO {self.removal_collection_name}
+        """
+
 class TicketItemStorageCreateException(Exception):
 
     """
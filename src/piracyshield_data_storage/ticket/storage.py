@@ -6,6 +6,16 @@ class TicketStorage(DatabaseArangodbDocument):
 
     ticket_item_collection_name = 'ticket_blocking_items'
 
+    ticket_item_revision_sequence = 'ticket_blocking_items'
+
+    indexes = [
+        { 'fields': ['ticket_id'] },
+        { 'fields': ['dda_id'] },
+        { 'fields': ['metadata.created_by'] },
+        { 'fields': ['metadata.created_at'] },
+        { 'fields': ['assigned_to[*]'] }
+    ]
+
     collection_name = 'ticket_blockings'
 
     collection_instance = None
@@ -108,7 +118,7 @@ class TicketStorage(DatabaseArangodbDocument):
         """
 
         try:
-            return self.query(aql, bind_vars = {
+            return self.query(aql, batch_size = 1, bind_vars = {
                 'dda_id': dda_id
             })
 
@@ -172,7 +182,7 @@ class TicketStorage(DatabaseArangodbDocument):
             FILTER
                 document.ticket_id == @ticket_id AND
                 (document.status == 'open' OR document.status == 'closed') AND
-                POSITION(document.assigned_to, @account_id) == true
+                @account_id IN document.assigned_to
 
             LET ticket_items = (
                 FOR ticket_item in {self.ticket_item_collection_name}
@@ -314,7 +324,7 @@ class TicketStorage(DatabaseArangodbDocument):
 
             FILTER
                 (document.status == 'open' OR document.status == 'closed') AND
-                POSITION(document.assigned_to, @account_id) == true
+                @account_id IN document.assigned_to
 
             LET ticket_items = (
                 FOR ticket_item in {self.ticket_item_collection_name}
@@ -394,7 +404,7 @@ class TicketStorage(DatabaseArangodbDocument):
         """
 
         try:
-            return self.query(aql, bind_vars = {
+            return self.query(aql, batch_size = 1, bind_vars = {
                 'ticket_id': ticket_id
             })
 
@@ -455,6 +465,19 @@ class TicketStorage(DatabaseArangodbDocument):
 
             FILTER document.ticket_id == @ticket_id
 
+            // the status decides whether the items are available, so they join the providers changes feed
+            LET ticket_items = (
+                FOR ticket_item IN {self.ticket_item_collection_name}
+
+                FILTER ticket_item.ticket_id == @ticket_id
+
+                UPDATE ticket_item WITH {{
+                    'revision': @revision
+                }} IN {self.ticket_item_collection_name}
+
+                RETURN true
+            )
+
             UPDATE document WITH {{
                 'status': @ticket_status
             }} IN {self.collection_name}
@@ -463,7 +486,8 @@ class TicketStorage(DatabaseArangodbDocument):
         """
 
         try:
-            affected_rows = self.query(
+            affected_rows = self._query_with_revision(
+                self.ticket_item_revision_sequence,
                 aql,
                 bind_vars = {
                     'ticket_id': ticket_id,
@@ -1,11 +1,20 @@
-from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument
+from piracyshield_data_storage.database.arangodb.document import DatabaseArangodbDocument, DatabaseArangodbQueryException
+from piracyshield_data_storage.database.arangodb.cursor import DatabaseArangodbPrefetchCursorException
 
 from arango.cursor import Cursor
 
+from typing import Iterator
+
 class WhitelistStorage(DatabaseArangodbDocument):
 
     collection_name = 'whitelist'
 
+    indexes = [
+        { 'fields': ['value'] },
+        { 'fields': ['metadata.created_by'] },
+        { 'fields': ['is_active', 'genre', 'value'] }
+    ]
+
     collection_instance = None
 
     def __init__(self):
@@ -125,6 +134,66 @@ class WhitelistStorage(DatabaseArangodbDocument):
         except:
             raise WhitelistStorageGetException()
 
+    def get_genres(self) -> list | Exception:
+        """
+        Gets the genres of the stored items.
+        The scan only runs again once the items have changed.
+
+        :return: a list of genres.
+        """
+
+        aql = f"""
+            FOR document IN {self.collection_name}
+
+            FILTER document.is_active == true
+
+            // follows the (is_active, genre, value) index
+            COLLECT genre = document.genre OPTIONS {{ method: 'sorted' }}
+
+            RETURN genre
+        """
+
+        try:
+            return self.query_cached(self.collection_instance, aql)
+
+        except:
+            raise WhitelistStorageGetException()
+
+    def get_active_values(self, genres: list = None) -> Iterator[tuple] | Exception:
+        """
+        Streams the active whitelist items, one genre after the other.
+        Unlike `get_active` the values are never collected in memory, neither on the server nor here.
+
+        :param genres: the genres to export, defaults to every stored genre.
+        :return: an iterator of (genre, value) pairs.
+        """
+
+        aql = f"""
+            FOR document IN {self.collection_name}
+
+            FILTER
+                document.is_active == true AND
+                document.genre == @genre
+
+            // follows the (is_active, genre, value) index, duplicates are adjacent
+            SORT document.value
+
+            RETURN document.value
+        """
+
+        try:
+            for genre in genres or self.get_genres():
+                previous = None
+
+                for value in self.iterate(aql, bind_vars = { 'genre': genre }):
+                    if value != previous:
+                        yield (genre, value)
+
+                    previous = value
+
+        except (DatabaseArangodbQueryException, DatabaseArangodbPrefetchCursorException):
+            raise WhitelistStorageGetException()
+
     def exists_by_value(self, value: str) -> Cursor | Exception:
         """
         Searches for an item.
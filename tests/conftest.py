@@ -0,0 +1,55 @@
+import pytest
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """
+    Points the Redis storages to an in-memory server, Lua scripts included.
+    """
+
+    fakeredis = pytest.importorskip('fakeredis')
+
+    pytest.importorskip('lupa')
+
+    from piracyshield_data_storage.database.redis.connection import DatabaseRedisConnection
+    from piracyshield_data_storage.database.redis.registry import DatabaseRedisConnectionRegistry, DatabaseRedisConnectionPool
+
+    server = fakeredis.FakeServer()
+
+    # renamed in recent releases
+    connection_class = getattr(fakeredis, 'FakeRedisConnection', None) or fakeredis.FakeConnection
+
+    class FakeConnectionPool(DatabaseRedisConnectionPool):
+
+        def __init__(self, **kwargs):
+            super().__init__(connection_class = connection_class, server = server, **kwargs)
+
+    registry = DatabaseRedisConnectionRegistry()
+
+    registry.pool_class = FakeConnectionPool
+
+    monkeypatch.setattr(DatabaseRedisConnection, 'registry', registry)
+
+    monkeypatch.setattr(DatabaseRedisConnection, '_prepare_configs', lambda self: setattr(self, 'database_config', {
+        'host': 'localhost',
+        'port': 6379
+    }))
+
+    return server
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    """
+    Points the cache storages to an empty folder.
+    """
+
+    pytest.importorskip('piracyshield_component')
+
+    from piracyshield_component.environment import Environment
+    from piracyshield_data_storage.cache.storage import CacheStorage
+
+    monkeypatch.setattr(Environment, 'CACHE_PATH', str(tmp_path))
+
+    # the indexes are shared by folder, for the whole process
+    monkeypatch.setattr(CacheStorage, 'indexes', {})
+
+    return tmp_path
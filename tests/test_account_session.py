@@ -0,0 +1,109 @@
+import pytest
+
+pytest.importorskip('piracyshield_component')
+
+from piracyshield_data_storage.account.session.memory import AccountSessionMemory
+
+import time
+
+@pytest.fixture
+def memory(redis_server):
+    return AccountSessionMemory(database = 0)
+
+def test_sessions_are_indexed_by_account(memory):
+    memory.add_long_session('account', 'refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    memory.add_short_session('account', 'refresh', 'access', { 'ip_address': '127.0.0.1' }, 60)
+
+    memory.add_long_session('other', 'other_refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    assert sorted(memory.get_all_by_account('account')) == sorted([
+        memory._get_session_key('account', 'long', 'refresh'),
+        memory._get_session_key('account', 'short', 'access')
+    ])
+
+    assert memory.get_all_short_by_account('account') == [memory._get_session_key('account', 'short', 'access')]
+
+def test_find_long_session_by_refresh_token(memory):
+    memory.add_long_session('account', 'refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    assert memory.find_long_session('refresh') == memory._get_session_key('account', 'long', 'refresh')
+
+    assert memory.find_long_session('unknown') is None
+
+def test_removed_sessions_leave_the_index(memory):
+    memory.add_long_session('account', 'refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    memory.add_short_session('account', 'refresh', 'access', { 'ip_address': '127.0.0.1' }, 60)
+
+    assert memory.remove_long_session('account', 'refresh')
+
+    assert memory.find_long_session('refresh') is None
+
+    assert memory.get_all_by_account('account') == [memory._get_session_key('account', 'short', 'access')]
+
+    assert memory.remove_short_session('account', 'access')
+
+    assert memory.get_all_by_account('account') == []
+
+def test_expired_sessions_leave_the_index(memory):
+    memory.add_short_session('account', 'refresh', 'expiring', { 'ip_address': '127.0.0.1' }, 1)
+
+    memory.add_short_session('account', 'refresh', 'access', { 'ip_address': '127.0.0.1' }, 60)
+
+    time.sleep(1.1)
+
+    assert memory.get_all_by_account('account') == [memory._get_session_key('account', 'short', 'access')]
+
+def test_migrate_sessions_indexes_existing_sessions(memory):
+    session = memory._get_session_key('account', 'long', 'refresh')
+
+    memory.instance.hset(session, mapping = { 'ip_address': '127.0.0.1' })
+
+    memory.instance.expire(session, 60)
+
+    assert memory.migrate_sessions() == 1
+
+    assert memory.get_all_by_account('account') == [session]
+
+    assert memory.find_long_session('refresh') == session
+
+    # running it again is harmless
+    assert memory.migrate_sessions() == 1
+
+    assert memory.get_all_by_account('account') == [session]
+
+def test_revoke_all_by_account(memory):
+    memory.add_long_session('account', 'refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    memory.add_short_session('account', 'refresh', 'access', { 'ip_address': '127.0.0.1' }, 60)
+
+    memory.add_long_session('other', 'other_refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    assert memory.revoke_all_by_account('account') == { 'long': 1, 'short': 1, 'blacklisted': 0 }
+
+    assert memory.get_all_by_account('account') == []
+
+    assert memory.find_long_session('refresh') is None
+
+    assert not memory.instance.exists(memory._get_session_key('account', 'short', 'access'))
+
+    assert memory.find_long_session('other_refresh') == memory._get_session_key('other', 'long', 'other_refresh')
+
+def test_revoke_all_by_account_blacklists_the_tokens(memory):
+    from piracyshield_data_storage.security.blacklist.memory import SecurityBlacklistMemory
+
+    blacklist = SecurityBlacklistMemory(database = 1)
+
+    memory.add_long_session('account', 'refresh', { 'ip_address': '127.0.0.1' }, 60)
+
+    memory.add_short_session('account', 'refresh', 'access', { 'ip_address': '127.0.0.1' }, 60)
+
+    assert memory.revoke_all_by_account('account', blacklist = blacklist)['blacklisted'] == 2
+
+    assert blacklist.exists_by_refresh_token('refresh')
+
+    assert blacklist.exists_by_access_token('access')
+
+    # blacklisted for the remaining time of the session
+    assert 0 < blacklist.instance.pttl(blacklist._get_token_key('access')) <= 60000
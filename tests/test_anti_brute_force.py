@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip('piracyshield_component')
+
+from piracyshield_data_storage.security.anti_brute_force.memory import SecurityAntiBruteForceMemory
+
+@pytest.fixture
+def memory(redis_server):
+    return SecurityAntiBruteForceMemory(database = 0)
+
+def test_fixed_window_counts_every_hit(memory):
+    outcomes = [memory.hit('counter', limit = 2, timeframe = 60) for _ in range(3)]
+
+    assert [outcome['attempts'] for outcome in outcomes] == [1, 2, 3]
+
+    assert [outcome['allowed'] for outcome in outcomes] == [True, True, False]
+
+    assert outcomes[-1]['remaining'] == 0
+
+    # the window starts with the first hit
+    assert 0 < outcomes[-1]['ttl'] <= 60
+
+    assert 0 < memory.instance.ttl('counter') <= 60
+
+def test_fixed_window_keeps_its_expiry(memory):
+    memory.hit('counter', limit = 5, timeframe = 60)
+
+    memory.instance.expire('counter', 10)
+
+    assert memory.hit('counter', limit = 5, timeframe = 60)['ttl'] <= 10
+
+def test_sliding_window_does_not_record_rejected_hits(memory):
+    outcomes = [memory.hit('counter', limit = 2, timeframe = 60, sliding = True) for _ in range(4)]
+
+    assert [outcome['allowed'] for outcome in outcomes] == [True, True, False, False]
+
+    assert memory.instance.zcard(f'counter:{memory.sliding_suffix}') == 2
+
+    assert 0 < outcomes[-1]['ttl'] <= 60
+
+def test_sliding_window_counts_the_amount(memory):
+    assert memory.hit('counter', limit = 3, timeframe = 60, sliding = True, amount = 3)['allowed']
+
+    assert not memory.hit('counter', limit = 3, timeframe = 60, sliding = True)['allowed']
+
+def test_login_attempts_share_the_key_of_the_counter(memory):
+    memory.hit_login_attempts('user@example.com', limit = 5, timeframe = 60)
+
+    memory.hit_login_attempts('user@example.com', limit = 5, timeframe = 60)
+
+    assert int(memory.get_login_attempts('user@example.com')) == 2
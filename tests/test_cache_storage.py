@@ -0,0 +1,347 @@
+import pytest
+
+pytest.importorskip('piracyshield_component')
+
+from piracyshield_data_storage.cache.storage import CacheStorage
+
+import hashlib
+import io
+import os
+import time
+
+# binary reads
+
+def test_read_bytes_and_text(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'content')
+
+    assert storage.read_bytes('file') == b'content'
+
+    assert storage.read('file') == 'content'
+
+def test_read_missing_file(cache_path):
+    with pytest.raises(FileNotFoundError):
+        CacheStorage().read_bytes('missing')
+
+def test_read_range(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'0123456789')
+
+    assert storage.read_range('file', 2, 3) == b'234'
+
+    # shorter at the end of the file
+    assert storage.read_range('file', 8, 10) == b'89'
+
+def test_open_buffer(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'0123456789')
+
+    with storage.open_buffer('file') as buffer:
+        assert bytes(buffer[2:5]) == b'234'
+
+    assert storage.get_digest('file') == hashlib.sha256(b'0123456789').hexdigest()
+
+def test_open_buffer_with_slices_kept_past_the_block(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'0123456789')
+
+    with storage.open_buffer('file') as buffer:
+        head = buffer[:4]
+
+    assert bytes(head) == b'0123'
+
+    head.release()
+
+def test_open_buffer_of_an_empty_file(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'')
+
+    with storage.open_buffer('file') as buffer:
+        assert bytes(buffer) == b''
+
+# atomic writes
+
+def test_write_stream(cache_path):
+    storage = CacheStorage()
+
+    result = storage.write_stream('file', io.BytesIO(b'x' * 3000), algorithm = 'sha256')
+
+    assert result == {
+        'path': os.path.join(cache_path, 'file'),
+        'size': 3000,
+        'digest': hashlib.sha256(b'x' * 3000).hexdigest()
+    }
+
+    assert storage.write_stream('chunks', (bytes([value]) for value in range(3)))['size'] == 3
+
+    assert storage.read_bytes('chunks') == b'\x00\x01\x02'
+
+def test_failed_write_keeps_the_previous_file(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'previous')
+
+    def chunks():
+        yield b'partial'
+
+        raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        storage.write_stream('file', chunks())
+
+    assert storage.read_bytes('file') == b'previous'
+
+    # no temporary file left behind
+    assert sorted(os.listdir(cache_path)) == ['file']
+
+def test_written_files_get_the_file_mode(cache_path):
+    storage = CacheStorage()
+
+    storage.write('file', b'content')
+
+    assert os.stat(cache_path / 'file').st_mode & 0o777 == storage.file_mode
+
+@pytest.mark.parametrize('fsync_policy, calls', [('none', 0), ('file', 1), ('full', 2)])
+def test_fsync_policy(cache_path, monkeypatch, fsync_policy, calls):
+    synced = []
+
+    monkeypatch.setattr(os, 'fsync', synced.append)
+
+    CacheStorage(fsync_policy = fsync_policy).write('file', b'content')
+
+    assert len(synced) == calls
+
+def test_unknown_fsync_policy(cache_path):
+    with pytest.raises(ValueError):
+        CacheStorage(fsync_policy = 'always')
+
+# budget and expiry
+
+def test_least_recently_used_entries_are_evicted_first(cache_path):
+    storage = CacheStorage(max_size = 30, eviction_policy = 'lru')
+
+    for filename in ('first', 'second', 'third'):
+        storage.write(filename, b'x' * 10)
+
+        time.sleep(0.01)
+
+    storage.read_bytes('first')
+
+    storage.write('fourth', b'x' * 10)
+
+    assert sorted(storage.get_all()) == ['first', 'fourth', 'third']
+
+def test_least_frequently_used_entries_are_evicted_first(cache_path):
+    storage = CacheStorage(max_size = 30, eviction_policy = 'lfu')
+
+    for filename in ('first', 'second', 'third'):
+        storage.write(filename, b'x' * 10)
+
+    storage.read_bytes('first')
+
+    storage.read_bytes('second')
+
+    storage.read_bytes('second')
+
+    storage.write('fourth', b'x' * 10)
+
+    assert sorted(storage.get_all()) == ['first', 'fourth', 'second']
+
+def test_an_entry_larger_than_the_budget_is_kept(cache_path):
+    storage = CacheStorage(max_size = 10)
+
+    storage.write('small', b'x' * 5)
+
+    storage.write('large', b'x' * 20)
+
+    assert storage.get_all() == ['large']
+
+def test_expired_entries_read_as_missing(cache_path, monkeypatch):
+    storage = CacheStorage(ttl = 60)
+
+    storage.write('file', b'content')
+
+    storage.write('kept', b'content', ttl = 600)
+
+    now = time.time()
+
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+
+    assert not storage.exists('file')
+
+    with pytest.raises(FileNotFoundError):
+        storage.read_bytes('file')
+
+    assert storage.read_bytes('kept') == b'content'
+
+def test_evict_sweeps_the_expired_entries(cache_path, monkeypatch):
+    storage = CacheStorage(ttl = 60)
+
+    storage.write('file', b'content')
+
+    now = time.time()
+
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+
+    assert storage.evict() == 1
+
+    assert storage.get_all() == []
+
+def test_files_cached_before_the_index_are_indexed(cache_path):
+    (cache_path / 'existing').write_bytes(b'x' * 10)
+
+    storage = CacheStorage(max_size = 100, ttl = 60)
+
+    assert storage.get_stats()['entries'] == 1
+
+    assert storage.get_stats()['size'] == 10
+
+    # the index is rebuilt with the default expiry
+    assert storage.index.get('existing')['expires_at'] is not None
+
+def test_accesses_are_written_in_batches(cache_path):
+    storage = CacheStorage(max_size = 100)
+
+    storage.write('file', b'content')
+
+    storage.read_bytes('file')
+
+    storage.read_bytes('file')
+
+    storage.index.flush()
+
+    assert storage.index.get('file')['hits'] == 2
+
+# sharded layout
+
+def test_sharded_files_live_in_subfolders(cache_path):
+    storage = CacheStorage(shard_depth = 2)
+
+    path = storage.write('file', b'content')
+
+    assert os.path.relpath(path, cache_path).count(os.sep) == 2
+
+    assert storage.get('file') == path
+
+    assert storage.read_bytes('file') == b'content'
+
+def test_sharded_storage_reads_the_flat_layout(cache_path):
+    CacheStorage().write('file', b'flat')
+
+    storage = CacheStorage(shard_depth = 2)
+
+    assert storage.exists('file')
+
+    assert storage.read_bytes('file') == b'flat'
+
+    # the sharded copy replaces the flat one
+    storage.write('file', b'sharded')
+
+    assert not os.path.exists(cache_path / 'file')
+
+    assert storage.read_bytes('file') == b'sharded'
+
+def test_migrate_layout(cache_path):
+    for filename in ('first', 'second'):
+        CacheStorage().write(filename, b'content')
+
+    storage = CacheStorage(shard_depth = 2)
+
+    assert storage.migrate_layout() == 2
+
+    assert sorted(storage.get_all()) == ['first', 'second']
+
+    assert all(entry['path'] != os.path.join(cache_path, entry['filename']) for entry in storage.scan())
+
+    assert storage.migrate_layout() == 0
+
+# content addressed files
+
+def test_identical_content_is_stored_once(cache_path):
+    storage = CacheStorage(content_addressed = True)
+
+    first = storage.write_stream('first', [b'content'])
+
+    storage.write('second', b'content')
+
+    assert storage.get_references(first['digest']) == 2
+
+    assert os.path.samefile(storage.get('first'), storage.get('second'))
+
+    assert os.path.samefile(storage.get('first'), storage.get_by_digest(first['digest']))
+
+def test_content_is_removed_with_its_last_name(cache_path):
+    storage = CacheStorage(content_addressed = True)
+
+    digest = storage.write_stream('first', [b'content'])['digest']
+
+    storage.write('second', b'content')
+
+    storage.remove('first')
+
+    assert storage.exists_digest(digest)
+
+    storage.remove('second')
+
+    assert not storage.exists_digest(digest)
+
+def test_replaced_content_is_released(cache_path):
+    storage = CacheStorage(max_size = 100, content_addressed = True)
+
+    digest = storage.write_stream('file', [b'previous'])['digest']
+
+    storage.write('file', b'current')
+
+    assert not storage.exists_digest(digest)
+
+def test_link_by_digest(cache_path):
+    storage = CacheStorage(content_addressed = True)
+
+    digest = storage.write_stream('first', [b'content'])['digest']
+
+    # digests are accepted in any case
+    assert storage.exists_digest(digest.upper())
+
+    storage.link('second', digest.upper())
+
+    assert storage.read_bytes('second') == b'content'
+
+    assert storage.get_references(digest) == 2
+
+    with pytest.raises(FileNotFoundError):
+        storage.link('third', '0' * 64)
+
+    with pytest.raises(ValueError):
+        storage.link('third', '../escape')
+
+def test_collect_removes_unnamed_content(cache_path):
+    storage = CacheStorage(content_addressed = True)
+
+    digest = storage.write_stream('file', [b'content'])['digest']
+
+    # removed without the storage, e.g. by hand
+    os.remove(storage.get('file'))
+
+    assert storage.collect() == 1
+
+    assert not storage.exists_digest(digest)
+
+def test_shared_content_is_counted_once(cache_path):
+    storage = CacheStorage(max_size = 100, content_addressed = True)
+
+    digest = storage.write_stream('first', [b'x' * 10])['digest']
+
+    storage.write('second', b'x' * 10)
+
+    assert storage.get_stats()['size'] == 10
+
+    storage.rebuild_index()
+
+    assert storage.index.get('first')['digest'] == digest
+
+    assert storage.get_stats()['size'] == 10